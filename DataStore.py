@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import uuid
+
+# Directory of the tables and stores built from the files of Data, outside
+# of it so that the data fingerprint of ResultCache does not change when
+# they are written
+DATA_STORE = "data_store"
+INDEX = "index.json"
+
+
+def file_hash(path):
+    """SHA-256 of the content of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_stamp(path):
+    """SHA-256, size and modification time of a file a table or store is built from"""
+    status = os.stat(path)
+    return {
+        "sha256": file_hash(path),
+        "size": status.st_size,
+        "mtime_ns": status.st_mtime_ns,
+    }
+
+
+def source_unchanged(path, stamp):
+    """Whether a file still matches the source_stamp recorded for it
+
+    The size and modification time are compared first, and the content is
+    only hashed when they differ. A missing file is taken as unchanged, so
+    that the built files can be used without their sources.
+    """
+    if not os.path.exists(path):
+        return True
+    status = os.stat(path)
+    if (status.st_size, status.st_mtime_ns) == (
+        stamp.get("size"),
+        stamp.get("mtime_ns"),
+    ):
+        return True
+    return file_hash(path) == stamp["sha256"]
+
+
+def replace_file(path, write):
+    """Writes a file under a temporary name and then moves it to path
+
+    Readers find either the previous file or the complete new one, and the
+    processes that memory-mapped the previous file keep reading it.
+
+    :param write: Function writing the content to a binary file object
+    """
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(temporary, "wb") as file:
+            write(file)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def write_json(path, content):
+    """Writes content as JSON through replace_file"""
+    replace_file(path, lambda file: file.write(json.dumps(content).encode()))
+
+
+def new_build(store):
+    """Creates the directory of a store and names a new build of it
+
+    The files of a build are written under build_file and only published,
+    with its index, by publish_index, so rebuilding a store never changes
+    the files of the build that running processes have open.
+
+    :return: The build name, to be recorded in the index as "build"
+    """
+    os.makedirs(store, exist_ok=True)
+    return uuid.uuid4().hex[:12]
+
+
+def build_file(store, build, name):
+    """Path of a file of a build of a store"""
+    return os.path.join(store, "{}_{}".format(build, name))
+
+
+def publish_index(store, index):
+    """Replaces the index of a store, then removes the files of older builds
+
+    Processes that memory-mapped the removed files keep their content.
+    """
+    write_json(os.path.join(store, INDEX), index)
+    prefix = index["build"] + "_"
+    for name in os.listdir(store):
+        if name != INDEX and not name.startswith(prefix) and not name.endswith(".tmp"):
+            os.remove(os.path.join(store, name))
+
+
+def index_modified(store):
+    """Modification time of the index of a store, or None if it has none"""
+    try:
+        return os.stat(os.path.join(store, INDEX)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def read_index(store):
+    """Index of a store with the modification time of its file
+
+    :return: (mtime_ns, index), or None if the store has no index
+    """
+    path = os.path.join(store, INDEX)
+    try:
+        with open(path) as file:
+            return os.fstat(file.fileno()).st_mtime_ns, json.load(file)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,154 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from DataStore import (
+    DATA_STORE,
+    build_file,
+    index_modified,
+    new_build,
+    publish_index,
+    read_index,
+    source_stamp,
+    source_unchanged,
+)
+
+DEMAND_WORKBOOK = "Data/three_month_demand.xlsx"
+DEMAND_STORE = os.path.join(DATA_STORE, "three_month_demand")
+TIME_COLUMNS = ["day", "month", "hour"]
+DEMAND_CLUSTERS = "Data/average_demand_and_clusters_for_demand_selection.csv"
+
+# Stores built with another version are ignored
+STORE_VERSION = 3
+
+_stores = {}
+_selection = {}
+_subsets = {}
+
+
+def build_demand_store(workbook=DEMAND_WORKBOOK, store=DEMAND_STORE):
+    """Converts the demand workbook into a store indexed by site
+
+    The time columns are written once, as time.npy, and the demand of all
+    the sites as one (sites × hours) demand.npy, so that the demand of a
+    site is a single contiguous row. index.json records the build, the site
+    of each row and the source_stamp of the workbook, see publish_index.
+
+    :return: The index as a dict
+    """
+    df = pd.read_excel(workbook)
+    sites = [column for column in df.columns if column not in TIME_COLUMNS]
+    build = new_build(store)
+    np.save(build_file(store, build, "time.npy"), df[TIME_COLUMNS].to_numpy())
+    np.save(
+        build_file(store, build, "demand.npy"),
+        np.ascontiguousarray(df[sites].to_numpy(dtype=float).T),
+    )
+    index = {
+        "version": STORE_VERSION,
+        "build": build,
+        "source": source_stamp(workbook),
+        "sites": sites,
+    }
+    publish_index(store, index)
+    print("Demand store of {} sites written to {}".format(len(sites), store))
+    return index
+
+
+def open_demand_store(store=DEMAND_STORE, workbook=DEMAND_WORKBOOK):
+    """Memory-maps the store once per process, again when it is rebuilt
+
+    :return: (rows, time, demand) where rows maps each site to its row of
+        demand, or None if there is no store of this version or the
+        workbook has changed since it was built
+    """
+    modified = index_modified(store)
+    if modified is None:
+        return None
+    if store not in _stores or _stores[store][0] != modified:
+        read = read_index(store)
+        if read is None:
+            return None
+        modified, index = read
+        opened = None
+        if index["version"] == STORE_VERSION:
+            try:
+                opened = (
+                    {site: row for row, site in enumerate(index["sites"])},
+                    np.load(
+                        build_file(store, index["build"], "time.npy"), mmap_mode="r"
+                    ),
+                    np.load(
+                        build_file(store, index["build"], "demand.npy"), mmap_mode="r"
+                    ),
+                )
+            except FileNotFoundError:
+                # Replaced by a newer build meanwhile, opened on the next call
+                return None
+        _stores[store] = (modified, index.get("source", {}), opened)
+    _, stamp, opened = _stores[store]
+    if opened is not None and not source_unchanged(workbook, stamp):
+        print("{} changed since the demand store was built".format(workbook))
+        return None
+    return opened
+
+
+def read_site_demand(site_id, store=DEMAND_STORE, workbook=DEMAND_WORKBOOK):
+    """Demand of a site from the store
+
+    :return: DataFrame of day, month, hour and Demand as
+        read_demand_from_xlsx_file, or None if the store is missing or
+        stale, or does not hold the site
+    """
+    opened = open_demand_store(store, workbook)
+    if opened is None or site_id not in opened[0]:
+        return None
+    rows, time, demand = opened
+    df = pd.DataFrame(np.array(time), columns=TIME_COLUMNS)
+    df["Demand"] = demand[rows[site_id]]
+    return df
+
+
+def demand_selection(path=DEMAND_CLUSTERS):
+    """Average demand profiles of the demand selection, grouped once per process
+
+    :return: (clusters, sites, empty) where clusters and sites are dicts of
+        the rows of each Cluster and each site_ID, in the order of the file,
+        and empty has the columns of the file and no rows
+    """
+    if path not in _selection:
+        df = pd.read_csv(path)
+        _selection[path] = (
+            dict(iter(df.groupby("Cluster", sort=False))),
+            dict(iter(df.groupby("site_ID", sort=False))),
+            df.iloc[:0],
+        )
+    return _selection[path]
+
+
+def cluster_profiles(cluster, sites=None, path=DEMAND_CLUSTERS):
+    """Profiles of a cluster, limited to its first sites if given
+
+    :return: DataFrame of the rows of the file, not to be modified
+    """
+    if (path, cluster, sites) not in _subsets:
+        clusters, _, empty = demand_selection(path)
+        df = clusters.get(cluster, empty)
+        if sites is not None:
+            df = df[df["site_ID"].isin(df["site_ID"].unique()[:sites])]
+        _subsets[(path, cluster, sites)] = df
+    return _subsets[(path, cluster, sites)]
+
+
+def site_profile(site_id, path=DEMAND_CLUSTERS):
+    """Profile of a site, empty if the site is not in the file
+
+    :return: DataFrame of the rows of the file, not to be modified
+    """
+    _, sites, empty = demand_selection(path)
+    return sites.get(site_id, empty)
+
+
+if __name__ == "__main__":
+    build_demand_store()
@@ -1,10 +1,413 @@
+import collections
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 import functions
 from figures import line_plot
 
+SUMMER_MONTHS = [12, 1, 2, 9, 10, 11]
+HEATING_MONTHS = [3, 4, 5, 6, 7, 8]
+
+# Every simulated day starts from rest at neutral - 1 until this hour
+START_HOUR = 6
+
+# Heating days start at the night setpoint until WINTER_START_HOUR, and the
+# day setpoint applies from DAY_SETPOINT_HOUR
+WINTER_START_HOUR = 2
+DAY_SETPOINT_HOUR = 7
+
+# Columns added to final_df by the cooling scenarios
+RESULT_COLUMNS = ["T_bs", "Q_bs", "W_bs", "T_spc", "Q_spc", "W_spc"]
+
+# Columns of the processed thermal dynamics files used by the thermal model
+# and the run, in the order of the files
+THERMAL_COLUMNS = ["month", "day", "hour", "agg_temp", "outdoor", "agg_AC", "SR"]
+
+# Suffixes of the strategies that run_scenarios only simulates on request
+OPTIONAL_STRATEGIES = ["opt", "mpc"]
+
+# Hours of the day (inclusive) covered by each occupancy checklist option
+OCCUPANCY_PERIODS = {1: (7, 9), 2: (10, 13), 3: (14, 17), 4: (18, 23), 5: (0, 6)}
+
+# Size of the baseline results memoized by baseline_scenario [bytes]
+BASELINE_CACHE_BYTES = 2**26
+
+# Order in which the fitted ARX coefficients are unpacked by the array kernels
+ARX_COEFFICIENTS = (
+    "outdoor1",
+    "agg_temp1",
+    "SR1",
+    "agg_AC1",
+    "agg_AC",
+    "outdoor",
+    "SR",
+    "outdoor2",
+    "agg_temp2",
+    "agg_AC2",
+    "SR2",
+    "const",
+)
+
+
+def unpack_coefficients(thermal_coefficients):
+    """Unpacks the fitted thermal coefficients into a tuple of scalars
+
+    :param thermal_coefficients: Series of model.params returned by create_thermal_model
+    :return: tuple of floats in the order of ARX_COEFFICIENTS
+    """
+    return tuple(float(thermal_coefficients[name]) for name in ARX_COEFFICIENTS)
+
+
+def _lagged_terms(coefficients, outdoor, SR, T, Q, i):
+    """Returns the terms of the ARX equation for hour i, except agg_AC * Q[i]
+
+    The terms are returned in the same order as the original hourly
+    equations, so that summing them reproduces the results bit for bit.
+    """
+    o1, t1, s1, q1, q0, o0, s0, o2, t2, q2, s2, const = coefficients
+    return (
+        o1 * outdoor[..., i - 1],
+        t1 * T[..., i - 1],
+        s1 * SR[..., i - 1],
+        q1 * Q[..., i - 1],
+        o0 * outdoor[..., i],
+        s0 * SR[..., i],
+        o2 * outdoor[..., i - 2],
+        t2 * T[..., i - 2],
+        q2 * Q[..., i - 2],
+        s2 * SR[..., i - 2],
+        const,
+    )
+
+
+def _indoor_temperature(terms, q0_Q):
+    """Indoor temperature of hour i given the lagged terms and agg_AC * Q[i]"""
+    T = terms[0] + terms[1] + terms[2] + terms[3] + q0_Q
+    for term in terms[4:]:
+        T = T + term
+    return T
+
+
+def _required_AC(terms, T_setpoint, q0):
+    """AC thermal power (negative for cooling) that brings hour i to T_setpoint"""
+    total = -T_setpoint
+    for term in terms:
+        total = total + term
+    return -total / q0
+
+
+def temperature_step(coefficients, outdoor, SR, T, Q, i):
+    """Indoor temperature of hour i for the AC power already set in Q[..., i]"""
+    terms = _lagged_terms(coefficients, outdoor, SR, T, Q, i)
+    return _indoor_temperature(terms, coefficients[4] * Q[..., i])
+
+
+def free_response(coefficients, outdoor, SR, T, Q, start, stop):
+    """Continues the indoor temperature from hour start to stop with the AC off
+
+    T and Q hold the history before start and are updated in place.
+    """
+    Q[..., start:stop] = 0
+    for i in range(start, stop):
+        T[..., i] = temperature_step(coefficients, outdoor, SR, T, Q, i)
+    return T
+
+
+def free_temperature(coefficients, outdoor, SR, neutral):
+    """Indoor temperature of the days simulated with the AC switched off"""
+    T = np.empty(outdoor.shape)
+    T[..., :START_HOUR] = neutral - 1
+    return free_response(
+        coefficients,
+        outdoor,
+        SR,
+        T,
+        np.zeros(outdoor.shape),
+        START_HOUR,
+        outdoor.shape[-1],
+    )
+
+
+def simulate_baseline_summer(
+    coefficients, outdoor, SR, occupancy, neutral, upper, AC_size, T_setpoint
+):
+    """Array kernel of the baseline cooling strategy
+
+    The last axis of the input arrays is the hour of the day. Any leading axes
+    (e.g. days) are simulated together, one hour step at a time.
+
+    :param coefficients: tuple of scalars returned by unpack_coefficients
+    :param T_setpoint: Temperature the AC cools to once the upper limit is exceeded
+    :return: (T, Q) arrays of indoor temperature and AC thermal power
+    """
+    q0 = coefficients[4]
+    T = np.empty(outdoor.shape)
+    Q = np.zeros(outdoor.shape)
+    T[..., :START_HOUR] = neutral - 1
+
+    for i in range(START_HOUR, outdoor.shape[-1]):
+        terms = _lagged_terms(coefficients, outdoor, SR, T, Q, i)
+        T_free = _indoor_temperature(terms, 0.0)
+        cooling = (T_free > upper) & (occupancy[..., i] == 1)
+        Q_cool = np.maximum(
+            np.minimum(_required_AC(terms, T_setpoint, q0), 0), -AC_size
+        )
+        Q[..., i] = np.where(cooling, Q_cool, 0.0)
+        T[..., i] = _indoor_temperature(terms, q0 * Q[..., i])
+
+    return T, Q
+
+
+def simulate_solar_precool(
+    coefficients,
+    outdoor,
+    SR,
+    surplus_PV,
+    occupancy,
+    neutral,
+    upper,
+    lower,
+    AC_size,
+    cop,
+    T_setpoint,
+):
+    """Array kernel of the solar pre-cooling strategy
+
+    The surplus PV generation is used to cool the building towards the lower
+    limit. If the upper limit is still exceeded while the building is occupied
+    and the AC has spare capacity, the AC tops up to T_setpoint from the grid.
+
+    :return: (T, Q) arrays of indoor temperature and AC thermal power
+    """
+    q0 = coefficients[4]
+    T = np.empty(outdoor.shape)
+    Q = np.zeros(outdoor.shape)
+    T[..., :START_HOUR] = neutral - 1
+
+    for i in range(START_HOUR, outdoor.shape[-1]):
+        terms = _lagged_terms(coefficients, outdoor, SR, T, Q, i)
+        Q_solar = np.maximum(
+            np.maximum(
+                np.minimum(_required_AC(terms, lower, q0), 0), -surplus_PV[..., i] * cop
+            ),
+            -AC_size,
+        )
+        T_solar = _indoor_temperature(terms, q0 * Q_solar)
+        top_up = (T_solar > upper) & (occupancy[..., i] == 1) & (Q_solar > -AC_size)
+        Q_grid = np.maximum(_required_AC(terms, T_setpoint, q0), -AC_size)
+        Q[..., i] = np.where(top_up, Q_grid, Q_solar)
+        T[..., i] = _indoor_temperature(terms, q0 * Q[..., i])
+
+    return T, Q
+
+
+def simulate_baseline_winter(
+    coefficients, outdoor, SR, night_setpoint, day_setpoint, AC_size
+):
+    """Array kernel of the baseline heating strategy
+
+    The AC heats to the night setpoint until DAY_SETPOINT_HOUR and to the
+    day setpoint afterwards, whenever the indoor temperature falls below it.
+
+    :return: (T, Q) arrays of indoor temperature and AC thermal power
+    """
+    q0 = coefficients[4]
+    T = np.empty(outdoor.shape)
+    Q = np.zeros(outdoor.shape)
+    T[..., :WINTER_START_HOUR] = night_setpoint
+
+    for i in range(WINTER_START_HOUR, outdoor.shape[-1]):
+        T_setpoint = night_setpoint if i < DAY_SETPOINT_HOUR else day_setpoint
+        terms = _lagged_terms(coefficients, outdoor, SR, T, Q, i)
+        T_free = _indoor_temperature(terms, 0.0)
+        Q_heat = np.minimum(np.maximum(_required_AC(terms, T_setpoint, q0), 0), AC_size)
+        Q[..., i] = np.where(T_free < T_setpoint, Q_heat, 0.0)
+        T[..., i] = _indoor_temperature(terms, q0 * Q[..., i])
+
+    return T, Q
+
+
+def simulate_solar_preheat(
+    coefficients,
+    outdoor,
+    SR,
+    surplus_PV,
+    night_setpoint,
+    day_setpoint,
+    upper,
+    AC_size,
+    cop,
+):
+    """Array kernel of the solar pre-heating strategy
+
+    The heating counterpart of simulate_solar_precool: the surplus PV
+    generation heats the building towards the upper limit, and the AC tops
+    up from the grid whenever the baseline setpoint is still not met.
+
+    :return: (T, Q) arrays of indoor temperature and AC thermal power
+    """
+    q0 = coefficients[4]
+    T = np.empty(outdoor.shape)
+    Q = np.zeros(outdoor.shape)
+    T[..., :WINTER_START_HOUR] = night_setpoint
+
+    for i in range(WINTER_START_HOUR, outdoor.shape[-1]):
+        T_setpoint = night_setpoint if i < DAY_SETPOINT_HOUR else day_setpoint
+        terms = _lagged_terms(coefficients, outdoor, SR, T, Q, i)
+        Q_solar = np.minimum(
+            np.minimum(
+                np.maximum(_required_AC(terms, upper, q0), 0),
+                surplus_PV[..., i] * cop,
+            ),
+            AC_size,
+        )
+        T_solar = _indoor_temperature(terms, q0 * Q_solar)
+        top_up = (T_solar < T_setpoint) & (Q_solar < AC_size)
+        Q_grid = np.minimum(np.maximum(_required_AC(terms, T_setpoint, q0), 0), AC_size)
+        Q[..., i] = np.where(top_up, Q_grid, Q_solar)
+        T[..., i] = _indoor_temperature(terms, q0 * Q[..., i])
+
+    return T, Q
+
+
+def discomfort(T, upper, occupancy):
+    """Degree-hours above the upper limit while the building is occupied"""
+    return np.maximum((T - upper) * occupancy, 0)
+
+
+def heating_discomfort(T, lower, occupancy):
+    """Degree-hours below the lower limit while the building is occupied"""
+    return np.maximum((lower - T) * occupancy, 0)
+
+
+def occupancy_profile(occupancy_checklist, hours=24):
+    """Hourly occupancy (1: occupied, 0: unoccupied) for the checked periods
+
+    Hours are positions within the simulated day, in the same way as
+    create_occupancy_column labels the rows of SH_ahead.
+    """
+    profile = np.zeros(hours, dtype=int)
+    for period, (start, end) in OCCUPANCY_PERIODS.items():
+        if period in occupancy_checklist:
+            profile[start : end + 1] = 1
+    return profile
+
+
+def stack_days(dates):
+    """Locates every hourly row in a (days × hours) matrix
+
+    :param dates: date of each hourly row
+    :return: (day, position) arrays, where day follows the order in which
+        dates first appear and position is the row number within its day
+    """
+    day = pd.factorize(dates)[0]
+    position = pd.Series(day).groupby(day).cumcount().to_numpy()
+    return day, position
+
+
+def to_day_matrix(values, day, position):
+    """Scatters an hourly column into a (days × hours) matrix padded with NaN"""
+    matrix = np.full((day.max() + 1, position.max() + 1), np.nan)
+    matrix[day, position] = values
+    return matrix
+
+
+def create_lags(df, lags):
+    """Adds lags 1..lags of every column of df and drops the incomplete rows"""
+    for c in df.columns:
+        for l in range(1, lags + 1):
+            df[c + str(l)] = df[c].shift(l)
+
+    df.dropna(axis=0, how="any", inplace=True)
+    return df
+
+
+def thermal_regression_data(df, lags=2):
+    """Regressors and regressand of the thermal model
+
+    :param df: Processed thermal dynamics, as read by read_thermal_dynamics_file
+    :return: (x, y) where y is agg_temp and x the other columns and all lags
+    """
+    lags_df = create_lags(df.iloc[:, 3:].copy(deep=True), lags)
+    return lags_df.iloc[:, 1:], lags_df["agg_temp"]
+
+
+def least_squares_fit(x, y, diagnostics=False):
+    """Ordinary least squares fit of y on x with a constant, as statsmodels OLS
+
+    :param x: DataFrame of the regressors
+    :param y: Series of the regressand
+    :param diagnostics: Also compute the R², adjusted R² and a summary
+        table of the coefficients with their standard errors and t values
+    :return: (params, covariance, diagnostics) where params is a Series
+        indexed by "const" and the columns of x, covariance is the
+        covariance of params and diagnostics is None unless requested
+    """
+    names = ["const"] + list(x.columns)
+    X = np.column_stack([np.ones(len(x)), x.to_numpy(dtype=float)])
+    Y = y.to_numpy(dtype=float)
+    coefficients, _, _, _ = np.linalg.lstsq(X, Y, rcond=None)
+
+    residuals = Y - X @ coefficients
+    dof = X.shape[0] - X.shape[1]
+    scale = residuals @ residuals / dof
+    covariance = scale * np.linalg.pinv(X.T @ X)
+    params = pd.Series(coefficients, index=names)
+    covariance = pd.DataFrame(covariance, index=names, columns=names)
+    if not diagnostics:
+        return params, covariance, None
+
+    total = ((Y - Y.mean()) ** 2).sum()
+    r_squared = 1 - residuals @ residuals / total
+    standard_errors = np.sqrt(np.diag(covariance))
+    summary = pd.DataFrame(
+        {
+            "coef": coefficients,
+            "std err": standard_errors,
+            "t": coefficients / standard_errors,
+        },
+        index=names,
+    )
+    return (
+        params,
+        covariance,
+        {
+            "r_squared": r_squared,
+            "adj_r_squared": 1 - (1 - r_squared) * (X.shape[0] - 1) / dof,
+            "standard_errors": pd.Series(standard_errors, index=names),
+            "summary": summary,
+        },
+    )
+
 
 class Building:
-    def __init__(self, starRating, weight, type, size, AC_size, city="Adelaide"):
+    def __init__(
+        self,
+        starRating,
+        weight,
+        type,
+        size,
+        AC_size,
+        city="Adelaide",
+        thermal_coefficients=None,
+        thermal_dynamics_df=None,
+        thermal_covariance=None,
+    ):
+        """
+        Without thermal_coefficients or thermal_dynamics_df, the
+        coefficients are looked up in the table built by
+        ThermalLibrary.build_coefficient_table, and the archetype is only
+        read and fitted if it is not in the table.
+
+        :param thermal_coefficients: Coefficients of a previous
+            create_thermal_model, which is then not run again
+        :param thermal_dynamics_df: Processed thermal dynamics of the
+            archetype, which is then not read again
+        :param thermal_covariance: Covariance of thermal_coefficients
+        """
         self.starRating = starRating
         self.weight = weight
         self.type = type
@@ -18,11 +421,22 @@ class Building:
         self.occupancy_checklist = [1, 3, 4]
         self.daily_results_dic = {}
         self.final_df = pd.DataFrame()
-        self.read_thermal_dynamics_file()
         self.upper_limit = 0
         self.neutral_temp = 0
         self.lower_limit = 0
-        self.thermal_coefficients = self.create_thermal_model(self.thermal_dynamics_df)
+        if thermal_coefficients is None and thermal_dynamics_df is None:
+            from ThermalLibrary import lookup_coefficients
+
+            thermal_coefficients, thermal_covariance = lookup_coefficients(
+                self.archetype()
+            )
+        self.thermal_covariance = thermal_covariance
+        self.thermal_dynamics_df = thermal_dynamics_df
+        if thermal_coefficients is None:
+            if thermal_dynamics_df is None:
+                self.read_thermal_dynamics_file()
+            thermal_coefficients = self.create_thermal_model(self.thermal_dynamics_df)
+        self.thermal_coefficients = thermal_coefficients
 
     def update_temperature_preferences(
         self, ready_df, neutral_temp, upper_limit, lower_limit
@@ -32,7 +446,13 @@ class Building:
         self.lower_limit = lower_limit
         self.ready_df = ready_df
 
-    def read_thermal_dynamics_file(self):
+    def archetype(self):
+        """Name of the archetype, as in Data/Processed_thermal_dynamics"""
+        return "{}_{}_{}_{}_{}".format(
+            self.size, self.type, self.starRating, self.weight, self.city
+        )
+
+    def read_thermal_dynamics_file(self, columns=THERMAL_COLUMNS):
         """
         Reads the processed thermal dynamics file
 
@@ -41,22 +461,26 @@ class Building:
         radiation, date and hour. The file is used to develop thermal
         dynamics model and extract coefficients.
 
+        :param columns: Columns to read, the thermal model needs all of
+            THERMAL_COLUMNS in this order
         :return:
         df: DataFrame
             One year AC demand, indoor temperature, and solar ratiation
         """
-        self.thermal_dynamics_df = pd.read_csv(
-            "Data/Processed_thermal_dynamics/{}_{}_{}_{}_{}.csv".format(
-                self.size, self.type, self.starRating, self.weight, self.city
-            )
-        )
-        print(
-            "Read thermal dynamics file Successful. {}_{}_{}_{}_{}".format(
-                self.size, self.type, self.starRating, self.weight, self.city
-            )
-        )
+        from ThermalLibrary import load_thermal_dynamics
+
+        # Only the pages of these columns are read from the memory-mapped
+        # store built by ThermalLibrary.build_thermal_store
+        arrays = load_thermal_dynamics(self.archetype(), columns)
+        if arrays is not None:
+            self.thermal_dynamics_df = pd.DataFrame(arrays, columns=columns)
+            return
 
-        self.thermal_dynamics_df.drop("Unnamed: 0", inplace=True, axis=1)
+        self.thermal_dynamics_df = pd.read_csv(
+            "Data/Processed_thermal_dynamics/{}.csv".format(self.archetype()),
+            usecols=columns,
+        )[columns]
+        print("Read thermal dynamics file Successful. {}".format(self.archetype()))
 
     def create_lags(self, df, lags):
         """Create lags of the thermal dynamics dataframe
@@ -69,41 +493,30 @@ class Building:
 
 
         """
-        for c in df.columns:
-            for l in range(1, lags + 1):
-                df[c + str(l)] = df[c].shift(l)
-
-        df.dropna(axis=0, how="any", inplace=True)
-        return df
+        return create_lags(df, lags)
 
-    def create_thermal_model(self, df, lags=2):
+    def create_thermal_model(self, df, lags=2, diagnostics=False):
         """creates the linear model and returns the coefficients
 
         df: The dataframe with four coloumns (agg_temp, outdoor,agg_AC, SR).It can be read from processed csv files
+        diagnostics: Also keep the R², standard errors and summary table of
+            the fit in self.thermal_diagnostics
         """
-        import statsmodels.api as sm
-        from sklearn import linear_model
-
-        lags_df = self.create_lags(
-            df=df.iloc[:, 3:].copy(deep=True),
-            lags=lags,
-        )
-
-        x = lags_df.iloc[:, 1:]
-        y = lags_df["agg_temp"]
-
-        regr = linear_model.LinearRegression()
-        regr.fit(x, y)
-
-        x = sm.add_constant(x)  # adding a constant
-
-        model = sm.OLS(y, x).fit()
-        predictions = model.predict(x)
-
-        print_model = model.summary()
-        # print(model.params)
-
-        return model.params
+        x, y = thermal_regression_data(df, lags)
+        params, covariance, fit_diagnostics = least_squares_fit(x, y, diagnostics)
+        # Kept for the Monte Carlo uncertainty of the coefficients
+        self.thermal_covariance = covariance
+        if diagnostics:
+            self.thermal_diagnostics = fit_diagnostics
+
+        return params
+
+    def day_arrays(self):
+        """Pulls the columns of the simulated day into contiguous float arrays"""
+        return {
+            column: self.SH_ahead[column].to_numpy(dtype=float)
+            for column in ["outdoor", "SR", "Surplus_PV", "Occupancy"]
+        }
 
     def baseline_summer(self, neutral, upper, setpoint="Upper"):
         """
@@ -119,335 +532,74 @@ class Building:
         :return: SH_ahead(DataFrame): DataFrame that contains the solved solution
         """
         setpoint_dic = {"Neutral": neutral, "Upper": upper}
-        # self.SH_ahead.reset_index(inplace=True,drop=True)
-        self.SH_ahead.loc[:, "T_bs"] = 0
-        self.SH_ahead.loc[:, "Q_bs"] = 1000
-
-        for i, row in self.SH_ahead.iterrows():
-            if i < 6:
-                self.SH_ahead.at[i, "Q_bs"] = 0
-                self.SH_ahead.at[i, "T_bs"] = neutral - 1
-            else:
-
-                self.SH_ahead.at[i, "Q_bs"] = 0
-                self.SH_ahead.at[i, "T_bs"] = (
-                    self.thermal_coefficients["outdoor1"]
-                    * self.SH_ahead.at[i - 1, "outdoor"]
-                    + self.thermal_coefficients["agg_temp1"]
-                    * self.SH_ahead.at[i - 1, "T_bs"]
-                    + self.thermal_coefficients["SR1"] * self.SH_ahead.at[i - 1, "SR"]
-                    + self.thermal_coefficients["agg_AC1"]
-                    * self.SH_ahead.at[i - 1, "Q_bs"]
-                    + self.thermal_coefficients["agg_AC"] * self.SH_ahead.at[i, "Q_bs"]
-                    + self.thermal_coefficients["outdoor"]
-                    * self.SH_ahead.at[i, "outdoor"]
-                    + self.thermal_coefficients["SR"] * self.SH_ahead.at[i, "SR"]
-                    + self.thermal_coefficients["outdoor2"]
-                    * self.SH_ahead.at[i - 2, "outdoor"]
-                    + self.thermal_coefficients["agg_temp2"]
-                    * self.SH_ahead.at[i - 2, "T_bs"]
-                    + self.thermal_coefficients["agg_AC2"]
-                    * self.SH_ahead.at[i - 2, "Q_bs"]
-                    + self.thermal_coefficients["SR2"] * self.SH_ahead.at[i - 2, "SR"]
-                    + self.thermal_coefficients["const"]
-                )
-                if (self.SH_ahead.at[i, "T_bs"] > upper) & (
-                    self.SH_ahead.at[i, "Occupancy"] == 1
-                ):
-                    T_setpoint = setpoint_dic[setpoint]
-
-                    Q_bs = (
-                        -(
-                            -T_setpoint
-                            + self.thermal_coefficients["outdoor1"]
-                            * self.SH_ahead.at[i - 1, "outdoor"]
-                            + self.thermal_coefficients["agg_temp1"]
-                            * self.SH_ahead.at[i - 1, "T_bs"]
-                            + self.thermal_coefficients["SR1"]
-                            * self.SH_ahead.at[i - 1, "SR"]
-                            + self.thermal_coefficients["agg_AC1"]
-                            * self.SH_ahead.at[i - 1, "Q_bs"]
-                            + self.thermal_coefficients["outdoor"]
-                            * self.SH_ahead.at[i, "outdoor"]
-                            + self.thermal_coefficients["SR"]
-                            * self.SH_ahead.at[i, "SR"]
-                            + self.thermal_coefficients["outdoor2"]
-                            * self.SH_ahead.at[i - 2, "outdoor"]
-                            + self.thermal_coefficients["agg_temp2"]
-                            * self.SH_ahead.at[i - 2, "T_bs"]
-                            + self.thermal_coefficients["agg_AC2"]
-                            * self.SH_ahead.at[i - 2, "Q_bs"]
-                            + self.thermal_coefficients["SR2"]
-                            * self.SH_ahead.at[i - 2, "SR"]
-                            + self.thermal_coefficients["const"]
-                        )
-                        / self.thermal_coefficients["agg_AC"]
-                    )
-                    Q_bs = min(Q_bs, 0)
-                    self.SH_ahead.at[i, "Q_bs"] = max(Q_bs, -self.AC_size)
-                    self.SH_ahead.at[i, "T_bs"] = (
-                        self.thermal_coefficients["outdoor1"]
-                        * self.SH_ahead.at[i - 1, "outdoor"]
-                        + self.thermal_coefficients["agg_temp1"]
-                        * self.SH_ahead.at[i - 1, "T_bs"]
-                        + self.thermal_coefficients["SR1"]
-                        * self.SH_ahead.at[i - 1, "SR"]
-                        + self.thermal_coefficients["agg_AC1"]
-                        * self.SH_ahead.at[i - 1, "Q_bs"]
-                        + self.thermal_coefficients["agg_AC"]
-                        * self.SH_ahead.at[i, "Q_bs"]
-                        + self.thermal_coefficients["outdoor"]
-                        * self.SH_ahead.at[i, "outdoor"]
-                        + self.thermal_coefficients["SR"] * self.SH_ahead.at[i, "SR"]
-                        + self.thermal_coefficients["outdoor2"]
-                        * self.SH_ahead.at[i - 2, "outdoor"]
-                        + self.thermal_coefficients["agg_temp2"]
-                        * self.SH_ahead.at[i - 2, "T_bs"]
-                        + self.thermal_coefficients["agg_AC2"]
-                        * self.SH_ahead.at[i - 2, "Q_bs"]
-                        + self.thermal_coefficients["SR2"]
-                        * self.SH_ahead.at[i - 2, "SR"]
-                        + self.thermal_coefficients["const"]
-                    )
-        self.SH_ahead["W_bs"] = (self.SH_ahead["T_bs"] - upper) * self.SH_ahead[
-            "Occupancy"
-        ]
-        self.SH_ahead["W_bs"] = self.SH_ahead["W_bs"].clip(lower=0)
-
-        # print(self.SH_ahead.head(24))
+        day = self.day_arrays()
+        T, Q = simulate_baseline_summer(
+            unpack_coefficients(self.thermal_coefficients),
+            outdoor=day["outdoor"],
+            SR=day["SR"],
+            occupancy=day["Occupancy"],
+            neutral=neutral,
+            upper=upper,
+            AC_size=self.AC_size,
+            T_setpoint=setpoint_dic[setpoint],
+        )
+        self.SH_ahead[["T_bs", "Q_bs", "W_bs"]] = np.column_stack(
+            (T, Q, discomfort(T, upper, day["Occupancy"]))
+        )
 
     def solar_precool(self, neutral, upper, lower, setpoint="Upper"):
         setpoint_dic = {"Neutral": neutral, "Upper": upper}
-        # self.SH_ahead.reset_index(inplace=True, drop=True)
-        self.SH_ahead.loc[:, "T_spc"] = 0
-        self.SH_ahead.loc[:, "Q_spc"] = 1000
-        for i, row in self.SH_ahead.iterrows():
-            if i < 6:
-                self.SH_ahead.at[i, "Q_spc"] = 0
-                self.SH_ahead.at[i, "T_spc"] = neutral - 1
-            elif i > 5:
-                T_setpoint = lower
-                Q_spc = (
-                    -(
-                        -T_setpoint
-                        + +self.thermal_coefficients["outdoor1"]
-                        * self.SH_ahead.at[i - 1, "outdoor"]
-                        + self.thermal_coefficients["agg_temp1"]
-                        * self.SH_ahead.at[i - 1, "T_spc"]
-                        + self.thermal_coefficients["SR1"]
-                        * self.SH_ahead.at[i - 1, "SR"]
-                        + self.thermal_coefficients["agg_AC1"]
-                        * self.SH_ahead.at[i - 1, "Q_spc"]
-                        + self.thermal_coefficients["outdoor"]
-                        * self.SH_ahead.at[i, "outdoor"]
-                        + self.thermal_coefficients["SR"] * self.SH_ahead.at[i, "SR"]
-                        + self.thermal_coefficients["outdoor2"]
-                        * self.SH_ahead.at[i - 2, "outdoor"]
-                        + self.thermal_coefficients["agg_temp2"]
-                        * self.SH_ahead.at[i - 2, "T_spc"]
-                        + self.thermal_coefficients["agg_AC2"]
-                        * self.SH_ahead.at[i - 2, "Q_spc"]
-                        + self.thermal_coefficients["SR2"]
-                        * self.SH_ahead.at[i - 2, "SR"]
-                        + self.thermal_coefficients["const"]
-                    )
-                    / self.thermal_coefficients["agg_AC"]
-                )
-                Q_spc = min(Q_spc, 0)  # Just cooling mode
-                self.SH_ahead.at[i, "Q_spc"] = max(
-                    [
-                        Q_spc,
-                        -self.SH_ahead.at[i, "Surplus_PV"] * self.cop,
-                        -self.AC_size,
-                    ]
-                )
-
-                self.SH_ahead.at[i, "T_spc"] = (
-                    self.thermal_coefficients["outdoor1"]
-                    * self.SH_ahead.at[i - 1, "outdoor"]
-                    + self.thermal_coefficients["agg_temp1"]
-                    * self.SH_ahead.at[i - 1, "T_spc"]
-                    + self.thermal_coefficients["SR1"] * self.SH_ahead.at[i - 1, "SR"]
-                    + self.thermal_coefficients["agg_AC1"]
-                    * self.SH_ahead.at[i - 1, "Q_spc"]
-                    + self.thermal_coefficients["agg_AC"] * self.SH_ahead.at[i, "Q_spc"]
-                    + self.thermal_coefficients["outdoor"]
-                    * self.SH_ahead.at[i, "outdoor"]
-                    + self.thermal_coefficients["SR"] * self.SH_ahead.at[i, "SR"]
-                    + self.thermal_coefficients["outdoor2"]
-                    * self.SH_ahead.at[i - 2, "outdoor"]
-                    + self.thermal_coefficients["agg_temp2"]
-                    * self.SH_ahead.at[i - 2, "T_spc"]
-                    + self.thermal_coefficients["agg_AC2"]
-                    * self.SH_ahead.at[i - 2, "Q_spc"]
-                    + self.thermal_coefficients["SR2"] * self.SH_ahead.at[i - 2, "SR"]
-                    + self.thermal_coefficients["const"]
-                )
-
-                if (self.SH_ahead.at[i, "T_spc"] > upper) & (
-                    self.SH_ahead.at[i, "Occupancy"] == 1
-                ):
-                    if (
-                        self.SH_ahead.at[i, "Q_spc"] > -self.AC_size
-                    ):  # It means the suprluss PV generation is smaller than AC capacity
-
-                        T_setpoint = setpoint_dic[setpoint]
-
-                        self.SH_ahead.at[i, "Q_spc"] = (
-                            -(
-                                -T_setpoint
-                                + +self.thermal_coefficients["outdoor1"]
-                                * self.SH_ahead.at[i - 1, "outdoor"]
-                                + self.thermal_coefficients["agg_temp1"]
-                                * self.SH_ahead.at[i - 1, "T_spc"]
-                                + self.thermal_coefficients["SR1"]
-                                * self.SH_ahead.at[i - 1, "SR"]
-                                + self.thermal_coefficients["agg_AC1"]
-                                * self.SH_ahead.at[i - 1, "Q_spc"]
-                                + self.thermal_coefficients["outdoor"]
-                                * self.SH_ahead.at[i, "outdoor"]
-                                + self.thermal_coefficients["SR"]
-                                * self.SH_ahead.at[i, "SR"]
-                                + self.thermal_coefficients["outdoor2"]
-                                * self.SH_ahead.at[i - 2, "outdoor"]
-                                + self.thermal_coefficients["agg_temp2"]
-                                * self.SH_ahead.at[i - 2, "T_spc"]
-                                + self.thermal_coefficients["agg_AC2"]
-                                * self.SH_ahead.at[i - 2, "Q_spc"]
-                                + self.thermal_coefficients["SR2"]
-                                * self.SH_ahead.at[i - 2, "SR"]
-                                + self.thermal_coefficients["const"]
-                            )
-                            / self.thermal_coefficients["agg_AC"]
-                        )
-
-                        self.SH_ahead.at[i, "Q_spc"] = max(
-                            [self.SH_ahead.at[i, "Q_spc"], -self.AC_size]
-                        )  # negative
-
-                        self.SH_ahead.at[i, "T_spc"] = (
-                            self.thermal_coefficients["outdoor1"]
-                            * self.SH_ahead.at[i - 1, "outdoor"]
-                            + self.thermal_coefficients["agg_temp1"]
-                            * self.SH_ahead.at[i - 1, "T_spc"]
-                            + self.thermal_coefficients["SR1"]
-                            * self.SH_ahead.at[i - 1, "SR"]
-                            + self.thermal_coefficients["agg_AC1"]
-                            * self.SH_ahead.at[i - 1, "Q_spc"]
-                            + self.thermal_coefficients["agg_AC"]
-                            * self.SH_ahead.at[i, "Q_spc"]
-                            + self.thermal_coefficients["outdoor"]
-                            * self.SH_ahead.at[i, "outdoor"]
-                            + self.thermal_coefficients["SR"]
-                            * self.SH_ahead.at[i, "SR"]
-                            + self.thermal_coefficients["outdoor2"]
-                            * self.SH_ahead.at[i - 2, "outdoor"]
-                            + self.thermal_coefficients["agg_temp2"]
-                            * self.SH_ahead.at[i - 2, "T_spc"]
-                            + self.thermal_coefficients["agg_AC2"]
-                            * self.SH_ahead.at[i - 2, "Q_spc"]
-                            + self.thermal_coefficients["SR2"]
-                            * self.SH_ahead.at[i - 2, "SR"]
-                            + self.thermal_coefficients["const"]
-                        )
-
-        self.SH_ahead["W_spc"] = (self.SH_ahead["T_spc"] - upper) * self.SH_ahead[
-            "Occupancy"
-        ]
-        self.SH_ahead["W_spc"] = self.SH_ahead["W_spc"].clip(lower=0)
+        day = self.day_arrays()
+        T, Q = simulate_solar_precool(
+            unpack_coefficients(self.thermal_coefficients),
+            outdoor=day["outdoor"],
+            SR=day["SR"],
+            surplus_PV=day["Surplus_PV"],
+            occupancy=day["Occupancy"],
+            neutral=neutral,
+            upper=upper,
+            lower=lower,
+            AC_size=self.AC_size,
+            cop=self.cop,
+            T_setpoint=setpoint_dic[setpoint],
+        )
+        self.SH_ahead[["T_spc", "Q_spc", "W_spc"]] = np.column_stack(
+            (T, Q, discomfort(T, upper, day["Occupancy"]))
+        )
 
     def baseline_winter(self, night_setpoint, day_setpoint):
         self.SH_ahead.reset_index(inplace=True, drop=True)
-        for i, row in self.SH_ahead.iterrows():
-            if i < 2:
-                self.SH_ahead.at[i, "Q_bs"] = 0
-                self.SH_ahead.at[i, "T_bs"] = night_setpoint
-                self.SH_ahead.at[i, "Q_bs_im"] = 0
-                self.SH_ahead.at[i, "W_bs"] = 0
-            else:
-                if (i > 1) & (i < 7):
-                    T_setpoint = night_setpoint
-                elif i > 6:
-                    T_setpoint = day_setpoint
-                self.SH_ahead.at[i, "Q_bs"] = 0
-                self.SH_ahead.at[i, "T_bs"] = (
-                    self.thermal_coefficients["outdoor1"]
-                    * self.SH_ahead.at[i - 1, "outdoor"]
-                    + self.thermal_coefficients["agg_temp1"]
-                    * self.SH_ahead.at[i - 1, "T_bs"]
-                    + self.thermal_coefficients["SR1"] * self.SH_ahead.at[i - 1, "SR"]
-                    + self.thermal_coefficients["agg_AC1"]
-                    * self.SH_ahead.at[i - 1, "Q_bs"]
-                    + self.thermal_coefficients["agg_AC"] * self.SH_ahead.at[i, "Q_bs"]
-                    + self.thermal_coefficients["outdoor"]
-                    * self.SH_ahead.at[i, "outdoor"]
-                    + self.thermal_coefficients["SR"] * self.SH_ahead.at[i, "SR"]
-                    + self.thermal_coefficients["outdoor2"]
-                    * self.SH_ahead.at[i - 2, "outdoor"]
-                    + self.thermal_coefficients["agg_temp2"]
-                    * self.SH_ahead.at[i - 2, "T_bs"]
-                    + self.thermal_coefficients["agg_AC2"]
-                    * self.SH_ahead.at[i - 2, "Q_bs"]
-                    + self.thermal_coefficients["SR2"] * self.SH_ahead.at[i - 2, "SR"]
-                    + self.thermal_coefficients["const"]
-                )
-                if self.SH_ahead.at[i, "T_bs"] < T_setpoint:
-                    # T_setpoint = self.Temperature_range_h_daytime[0]
-                    Q_bs = (
-                        -(
-                            -T_setpoint
-                            + self.thermal_coefficients["outdoor1"]
-                            * self.SH_ahead.at[i - 1, "outdoor"]
-                            + self.thermal_coefficients["agg_temp1"]
-                            * self.SH_ahead.at[i - 1, "T_bs"]
-                            + self.thermal_coefficients["SR1"]
-                            * self.SH_ahead.at[i - 1, "SR"]
-                            + self.thermal_coefficients["agg_AC1"]
-                            * self.SH_ahead.at[i - 1, "Q_bs"]
-                            + self.thermal_coefficients["outdoor"]
-                            * self.SH_ahead.at[i, "outdoor"]
-                            + self.thermal_coefficients["SR"]
-                            * self.SH_ahead.at[i, "SR"]
-                            + self.thermal_coefficients["outdoor2"]
-                            * self.SH_ahead.at[i - 2, "outdoor"]
-                            + self.thermal_coefficients["agg_temp2"]
-                            * self.SH_ahead.at[i - 2, "T_bs"]
-                            + self.thermal_coefficients["agg_AC2"]
-                            * self.SH_ahead.at[i - 2, "Q_bs"]
-                            + self.thermal_coefficients["SR2"]
-                            * self.SH_ahead.at[i - 2, "SR"]
-                            + self.thermal_coefficients["const"]
-                        )
-                        / self.thermal_coefficients["agg_AC"]
-                    )
-                    Q_bs = max(0, Q_bs)
-                    self.SH_ahead.at[i, "Q_bs"] = min(Q_bs, self.AC_size)
-                    self.SH_ahead.at[i, "T_bs"] = (
-                        self.thermal_coefficients["outdoor1"]
-                        * self.SH_ahead.at[i - 1, "outdoor"]
-                        + self.thermal_coefficients["agg_temp1"]
-                        * self.SH_ahead.at[i - 1, "T_bs"]
-                        + self.thermal_coefficients["SR1"]
-                        * self.SH_ahead.at[i - 1, "SR"]
-                        + self.thermal_coefficients["agg_AC1"]
-                        * self.SH_ahead.at[i - 1, "Q_bs"]
-                        + self.thermal_coefficients["agg_AC"]
-                        * self.SH_ahead.at[i, "Q_bs"]
-                        + self.thermal_coefficients["outdoor"]
-                        * self.SH_ahead.at[i, "outdoor"]
-                        + self.thermal_coefficients["SR"] * self.SH_ahead.at[i, "SR"]
-                        + self.thermal_coefficients["outdoor2"]
-                        * self.SH_ahead.at[i - 2, "outdoor"]
-                        + self.thermal_coefficients["agg_temp2"]
-                        * self.SH_ahead.at[i - 2, "T_bs"]
-                        + self.thermal_coefficients["agg_AC2"]
-                        * self.SH_ahead.at[i - 2, "Q_bs"]
-                        + self.thermal_coefficients["SR2"]
-                        * self.SH_ahead.at[i - 2, "SR"]
-                        + self.thermal_coefficients["const"]
-                    )
-
-    def groupby_final_results(self):
+        day = self.day_arrays()
+        T, Q = simulate_baseline_winter(
+            unpack_coefficients(self.thermal_coefficients),
+            outdoor=day["outdoor"],
+            SR=day["SR"],
+            night_setpoint=night_setpoint,
+            day_setpoint=day_setpoint,
+            AC_size=self.AC_size,
+        )
+        self.SH_ahead[["T_bs", "Q_bs", "W_bs"]] = np.column_stack(
+            (T, Q, heating_discomfort(T, self.lower_limit, day["Occupancy"]))
+        )
+
+    def solar_preheat(self, night_setpoint, day_setpoint, upper):
+        day = self.day_arrays()
+        T, Q = simulate_solar_preheat(
+            unpack_coefficients(self.thermal_coefficients),
+            outdoor=day["outdoor"],
+            SR=day["SR"],
+            surplus_PV=day["Surplus_PV"],
+            night_setpoint=night_setpoint,
+            day_setpoint=day_setpoint,
+            upper=upper,
+            AC_size=self.AC_size,
+            cop=self.cop,
+        )
+        self.SH_ahead[["T_spc", "Q_spc", "W_spc"]] = np.column_stack(
+            (T, Q, heating_discomfort(T, self.lower_limit, day["Occupancy"]))
+        )
+
+    def groupby_final_results(self, dump_csv=True):
         self.averaged_hourly_results = self.final_df.groupby("hour").agg(
             {
                 "outdoor": "mean",
@@ -467,7 +619,12 @@ class Building:
         )
         self.averaged_hourly_results["PV"] = self.averaged_hourly_results["PV"]
         self.averaged_hourly_results.reset_index(inplace=True)
-        self.averaged_hourly_results.to_csv("Average_hourly_result.csv")
+        if dump_csv:
+            self.averaged_hourly_results.to_csv("Average_hourly_result.csv")
+
+    def optional_strategies(self):
+        """Suffixes of the optional strategies simulated into final_df"""
+        return [s for s in OPTIONAL_STRATEGIES if "Q_" + s in self.final_df]
 
     def calculate_imports_exports(self):
         self.final_df[["E_bs", "E_spc"]] = (
@@ -496,7 +653,27 @@ class Building:
         )  # kg
         self.total_emission_reduction = self.final_df["Emission_reduction"].sum()
 
-    def calculate_savings(self):
+        for strategy in self.optional_strategies():
+            self.final_df["E_" + strategy] = (
+                abs(self.final_df["Q_" + strategy]) / self.cop
+            )
+            net = (
+                self.final_df["Demand"]
+                + self.final_df["E_" + strategy]
+                - self.final_df["PV"]
+            )
+            self.final_df["Imports_" + strategy] = net.clip(lower=0)
+            self.final_df["Export_" + strategy] = -net.clip(upper=0)
+            self.final_df["Emission_reduction_" + strategy] = (
+                self.final_df["Imports_bs"] - self.final_df["Imports_" + strategy]
+            ) * self.final_df["Emission_intensity"]
+            setattr(
+                self,
+                "total_emission_reduction_" + strategy,
+                self.final_df["Emission_reduction_" + strategy].sum(),
+            )
+
+    def calculate_savings(self, dump_csv=True):
         self.final_df["cost_bs"] = (
             self.final_df["Imports_bs"] * self.final_df["Tariff"]
             - self.final_df["Export_bs"] * self.final_df["FiT"]
@@ -506,7 +683,21 @@ class Building:
             - self.final_df["Export_spc"] * self.final_df["FiT"]
         )
         self.final_df["Savings"] = self.final_df["cost_bs"] - self.final_df["cost_spc"]
-        self.final_df.to_csv("final_df_after_savings.csv")
+        for strategy in self.optional_strategies():
+            self.final_df["cost_" + strategy] = (
+                self.final_df["Imports_" + strategy] * self.final_df["Tariff"]
+                - self.final_df["Export_" + strategy] * self.final_df["FiT"]
+            )
+            self.final_df["Savings_" + strategy] = (
+                self.final_df["cost_bs"] - self.final_df["cost_" + strategy]
+            )
+            setattr(
+                self,
+                "total_cost_Savings_" + strategy,
+                self.final_df["Savings_" + strategy].sum(),
+            )
+        if dump_csv:
+            self.final_df.to_csv("final_df_after_savings.csv")
         self.total_cost_Savings = self.final_df["Savings"].sum()
         self.monthly_saving = self.final_df.groupby("month").agg({"Savings": "sum"})
         self.monthly_saving.reset_index(inplace=True)
@@ -529,19 +720,585 @@ class Building:
         1: Building is occupied
         0: building is unoccupied
         """
-        if 1 in self.occupancy_checklist:
-            self.SH_ahead.loc[7:9, "Occupancy"] = 1
-        if 2 in self.occupancy_checklist:
-            self.SH_ahead.loc[10:13, "Occupancy"] = 1
-        if 3 in self.occupancy_checklist:
-            self.SH_ahead.loc[14:17, "Occupancy"] = 1
-        if 4 in self.occupancy_checklist:
-            self.SH_ahead.loc[18:23, "Occupancy"] = 1
-        if 5 in self.occupancy_checklist:
-            self.SH_ahead.loc[0:6, "Occupancy"] = 1
+        occupied = occupancy_profile(self.occupancy_checklist, len(self.SH_ahead))
+        self.SH_ahead.loc[occupied == 1, "Occupancy"] = 1
 
         # print(self.SH_ahead)
 
+    def season_results(self, months, simulate, options, ready_df=None, workers=1):
+        """Simulates the days of the given months together as (days × hours) matrices
+
+        :param simulate: simulate_cooling_scenarios or simulate_heating_scenarios
+        :param options: Arguments of simulate other than the input matrices
+        :param ready_df: Rows to simulate, by default self.ready_df
+        :param workers: Number of worker processes the days are split
+            across (see simulate_in_workers)
+        :return: DataFrame of the simulated rows in the same form as final_df
+        """
+        if ready_df is None:
+            ready_df = self.ready_df
+        rows, day, position = season_rows(ready_df, months)
+        occupancy = occupancy_profile(self.occupancy_checklist, position.max() + 1)
+        arrays = {
+            column: to_day_matrix(rows[column].to_numpy(dtype=float), day, position)
+            for column in ["outdoor", "SR", "Surplus_PV"]
+        }
+        arrays["surplus_PV"] = arrays.pop("Surplus_PV")
+        results = simulate_in_workers(
+            simulate,
+            dict(options, occupancy=occupancy),
+            arrays,
+            workers,
+        )
+
+        season_df = rows.set_index(position)
+        season_df["Occupancy"] = occupancy[position]
+        season_df[RESULT_COLUMNS] = np.column_stack(
+            [results[column][day, position] for column in RESULT_COLUMNS]
+        )
+        return season_df
+
+    def cooling_results(self, setpoint="Neutral", ready_df=None, workers=1):
+        setpoint_dic = {"Neutral": self.neutral_temp, "Upper": self.upper_limit}
+        return self.season_results(
+            SUMMER_MONTHS,
+            simulate_cooling_scenarios,
+            dict(
+                coefficients=unpack_coefficients(self.thermal_coefficients),
+                AC_size=self.AC_size,
+                neutral=self.neutral_temp,
+                upper=self.upper_limit,
+                lower=self.lower_limit,
+                cop=self.cop,
+                T_setpoint=setpoint_dic[setpoint],
+                # Shared by the runs of this building that only change the
+                # PV, the demand, the lower limit or the tariff
+                memoize=workers == 1,
+            ),
+            ready_df,
+            workers,
+        )
+
+    def heating_results(self, ready_df=None, workers=1):
+        """Simulates the heating months with the lower limit as the night
+        setpoint and the neutral temperature as the day setpoint"""
+        return self.season_results(
+            HEATING_MONTHS,
+            simulate_heating_scenarios,
+            dict(
+                coefficients=unpack_coefficients(self.thermal_coefficients),
+                AC_size=self.AC_size,
+                night_setpoint=self.lower_limit,
+                day_setpoint=self.neutral_temp,
+                upper=self.upper_limit,
+                lower=self.lower_limit,
+                cop=self.cop,
+            ),
+            ready_df,
+            workers,
+        )
+
+    def year_results(self, setpoint="Neutral", ready_df=None, workers=1):
+        """Simulates the cooling and the heating months of ready_df
+
+        :return: DataFrame of the simulated rows in the order of ready_df
+        """
+        if ready_df is None:
+            ready_df = self.ready_df
+        dates = pd.unique(ready_df["date"])
+        months = pd.to_datetime(dates).month
+        seasons = []
+        if months.isin(SUMMER_MONTHS).any():
+            seasons.append(self.cooling_results(setpoint, ready_df, workers))
+        if months.isin(HEATING_MONTHS).any():
+            seasons.append(self.heating_results(ready_df, workers))
+        year_df = pd.concat(seasons)
+        order = pd.Index(dates).get_indexer(year_df["date"])
+        return year_df.iloc[np.argsort(order, kind="stable")]
+
+    def simulate_summer(self, setpoint="Neutral", workers=1):
+        """Simulates all summer days together as (days × hours) matrices
+
+        Every day starts from the same initial conditions, so the days are
+        independent and can be advanced one hour step at a time together.
+        The result is the same final_df as simulating the days one by one.
+
+        :param workers: Number of worker processes the days are split across
+        """
+        self.final_df = self.cooling_results(setpoint, workers=workers)
+
+    def simulate_year(self, setpoint="Neutral", workers=1):
+        """Simulates the cooling and the heating months in one pass
+
+        final_df holds the days in the same order as ready_df.
+        """
+        self.final_df = self.year_results(setpoint, workers=workers)
+
+    def simulate_days(self, full_year=False):
+        """Simulates the days one at a time with the hourly methods
+
+        ready_df is grouped once, each day is a slice of the grouped rows,
+        and the results are written into preallocated columns from which
+        final_df is built at the end.
+
+        :param full_year: Also simulate the HEATING_MONTHS
+        """
+        months = SUMMER_MONTHS + HEATING_MONTHS if full_year else SUMMER_MONTHS
+        rows, day, position = season_rows(self.ready_df, months)
+        starts = np.flatnonzero(position == 0)
+        stops = np.append(starts[1:], len(rows))
+        day_months = pd.to_datetime(rows["date"].iloc[starts]).dt.month.to_numpy()
+        occupancy = rows["Occupancy"].to_numpy().copy()
+        results = np.empty((len(rows), len(RESULT_COLUMNS)))
+
+        for start, stop, month in zip(starts, stops, day_months):
+            self.SH_ahead = rows.iloc[start:stop].reset_index(drop=True)
+            self.create_occupancy_column()
+            if month in SUMMER_MONTHS:
+                self.baseline_summer(
+                    neutral=self.neutral_temp,
+                    upper=self.upper_limit,
+                    setpoint="Neutral",
+                )
+                self.solar_precool(
+                    neutral=self.neutral_temp,
+                    lower=self.lower_limit,
+                    upper=self.upper_limit,
+                    setpoint="Neutral",
+                )
+            else:
+                self.baseline_winter(
+                    night_setpoint=self.lower_limit,
+                    day_setpoint=self.neutral_temp,
+                )
+                self.solar_preheat(
+                    night_setpoint=self.lower_limit,
+                    day_setpoint=self.neutral_temp,
+                    upper=self.upper_limit,
+                )
+            occupancy[start:stop] = self.SH_ahead["Occupancy"].to_numpy()
+            results[start:stop] = self.SH_ahead[RESULT_COLUMNS].to_numpy(dtype=float)
+
+        self.final_df = rows.set_index(position)
+        self.final_df["Occupancy"] = occupancy
+        self.final_df[RESULT_COLUMNS] = results
+
+    def iterate_days(self, full_year=False, setpoint="Neutral", days=15):
+        """Simulates the season in batches of days and yields each day
+
+        The batches are simulated together as (days × hours) matrices, so
+        the results are the same as simulate_summer and simulate_year, which
+        this generator leaves in final_df once it is exhausted.
+
+        :param full_year: Also simulate the HEATING_MONTHS
+        :param days: Number of days simulated together
+        :return: Generator of (date, day_df) in the order of final_df
+        """
+        months = SUMMER_MONTHS + HEATING_MONTHS if full_year else SUMMER_MONTHS
+        rows, day, position = season_rows(self.ready_df, months)
+        starts = np.flatnonzero(position == 0)
+        boundaries = np.append(starts[::days], len(rows))
+        batches = []
+        for start, stop in zip(boundaries[:-1], boundaries[1:]):
+            if full_year:
+                batch_df = self.year_results(setpoint, rows.iloc[start:stop])
+            else:
+                batch_df = self.cooling_results(setpoint, rows.iloc[start:stop])
+            batches.append(batch_df)
+            yield from day_slices(batch_df)
+        self.final_df = pd.concat(batches)
+
+    def store_daily_results(self):
+        """Keeps each day of final_df as a slice that shares its memory"""
+        for date, day_df in day_slices(self.final_df):
+            self.daily_results_dic[date] = day_df
+
+
+_worker_shared = None
+
+
+def _set_worker_shared(function, shared):
+    global _worker_shared
+    _worker_shared = (function, shared)
+
+
+def _call_worker(task):
+    function, shared = _worker_shared
+    return function(shared, task)
+
+
+def check_workers(workers):
+    """Raises ValueError unless workers is None or a positive number of processes"""
+    if workers is not None and (
+        not isinstance(workers, (int, np.integer)) or workers < 1
+    ):
+        raise ValueError(
+            "workers must be None or a positive integer, not {!r}".format(workers)
+        )
+
+
+def map_in_workers(function, shared, tasks, workers=1):
+    """Returns [function(shared, task) for task in tasks] computed in worker processes
+
+    Every worker receives shared once, when it starts, so that the tasks
+    only carry what differs between them.
+
+    :param function: Module-level function of (shared, task)
+    :param workers: Number of worker processes, None for one per CPU and 1
+        to run in this process
+    """
+    check_workers(workers)
+    if workers == 1:
+        return [function(shared, task) for task in tasks]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_set_worker_shared,
+        initargs=(function, shared),
+    ) as executor:
+        return list(executor.map(_call_worker, tasks))
+
+
+def _leading_slice(values, chunk):
+    if isinstance(values, tuple):
+        return tuple(_leading_slice(value, chunk) for value in values)
+    return values[chunk]
+
+
+def _simulate_chunk(task, chunk):
+    simulate, options, arrays = task
+    return simulate(
+        **options,
+        **{name: _leading_slice(values, chunk) for name, values in arrays.items()},
+    )
+
+
+def simulate_in_workers(simulate, options, arrays, workers=1):
+    """Runs simulate with the arrays split along their leading axis across processes
+
+    The days (or buildings) along the leading axis are independent, so the
+    results are identical to a single call. The tasks are only slices of
+    the arrays, see map_in_workers.
+
+    :param simulate: Module-level function returning a dict of result arrays
+    :param options: Arguments shared by all the slices
+    :param arrays: Arguments split along their leading axis, given as
+        arrays or tuples of arrays
+    :param workers: Number of worker processes, None for one per CPU and 1
+        to run in this process
+    :return: dict of the result arrays joined along the leading axis
+    """
+    check_workers(workers)
+    if workers == 1:
+        return simulate(**options, **arrays)
+    first = next(iter(arrays.values()))
+    size = len(first[0] if isinstance(first, tuple) else first)
+    bounds = np.linspace(0, size, min(workers or os.cpu_count(), size) + 1)
+    bounds = bounds.astype(int)
+    chunks = [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+    parts = map_in_workers(
+        _simulate_chunk, (simulate, options, arrays), chunks, workers
+    )
+    return {
+        column: np.concatenate([part[column] for part in parts]) for column in parts[0]
+    }
+
+
+def day_slices(df):
+    """Yields (date, day_df) for each day of df whose rows are grouped by day"""
+    position = stack_days(df["date"])[1]
+    starts = np.flatnonzero(position == 0)
+    stops = np.append(starts[1:], len(df))
+    for start, stop in zip(starts, stops):
+        yield df["date"].iat[start], df.iloc[start:stop]
+
+
+def season_rows(ready_df, months):
+    """Selects the rows of the given months and locates them in a (days × hours) grid
+
+    :return: (rows, day, position), where rows keeps the order in which
+        run_scenarios simulates the days and day, position are the
+        coordinates of each row returned by stack_days
+    """
+    day, dates = pd.factorize(ready_df["date"])
+    selected_day = pd.to_datetime(dates).month.isin(months)
+    rows = np.flatnonzero(selected_day[day])
+    rows = ready_df.iloc[rows[np.argsort(day[rows], kind="stable")]]
+    return (rows,) + stack_days(rows["date"])
+
+
+def summer_rows(ready_df):
+    """Selects the summer rows of ready_df, see season_rows"""
+    return season_rows(ready_df, SUMMER_MONTHS)
+
+
+_baseline_cache = collections.OrderedDict()
+
+
+def simulate_baseline_scenario(
+    coefficients, outdoor, SR, occupancy, neutral, upper, AC_size, T_setpoint
+):
+    """Baseline cooling results of simulate_cooling_scenarios
+
+    :return: dict of the T_bs, Q_bs and W_bs arrays
+    """
+    T_bs, Q_bs = simulate_baseline_summer(
+        coefficients,
+        outdoor=outdoor,
+        SR=SR,
+        occupancy=occupancy,
+        neutral=neutral,
+        upper=upper,
+        AC_size=AC_size,
+        T_setpoint=T_setpoint,
+    )
+    return {"T_bs": T_bs, "Q_bs": Q_bs, "W_bs": discomfort(T_bs, upper, occupancy)}
+
+
+def baseline_scenario(
+    coefficients, outdoor, SR, occupancy, neutral, upper, AC_size, T_setpoint
+):
+    """Baseline cooling results, memoized by a hash of their inputs
+
+    The baseline does not depend on the PV, the demand, the lower limit or
+    the tariff, so the scenarios of one building that only differ in these
+    share it. The most recently used results are kept up to
+    BASELINE_CACHE_BYTES and returned as read-only arrays. Inputs that are
+    never simulated again, such as coefficient draws or fleets of
+    buildings, should use simulate_baseline_scenario instead.
+
+    :return: dict of the T_bs, Q_bs and W_bs arrays
+    """
+    digest = hashlib.sha256()
+    for value in coefficients + (
+        outdoor,
+        SR,
+        occupancy,
+        neutral,
+        upper,
+        AC_size,
+        T_setpoint,
+    ):
+        value = np.ascontiguousarray(value, dtype=float)
+        digest.update(repr(value.shape).encode())
+        digest.update(value.tobytes())
+    key = digest.hexdigest()
+    if key in _baseline_cache:
+        _baseline_cache.move_to_end(key)
+        return _baseline_cache[key]
+
+    results = simulate_baseline_scenario(
+        coefficients,
+        outdoor=outdoor,
+        SR=SR,
+        occupancy=occupancy,
+        neutral=neutral,
+        upper=upper,
+        AC_size=AC_size,
+        T_setpoint=T_setpoint,
+    )
+    for values in results.values():
+        values.flags.writeable = False
+    _baseline_cache[key] = results
+    size = sum(v.nbytes for r in _baseline_cache.values() for v in r.values())
+    while size > BASELINE_CACHE_BYTES:
+        _, evicted = _baseline_cache.popitem(last=False)
+        size -= sum(values.nbytes for values in evicted.values())
+    return results
+
+
+def simulate_cooling_scenarios(
+    coefficients,
+    AC_size,
+    outdoor,
+    SR,
+    surplus_PV,
+    occupancy,
+    neutral,
+    upper,
+    lower,
+    cop,
+    T_setpoint,
+    baseline=None,
+    memoize=False,
+):
+    """Runs the baseline and solar pre-cooling kernels over stacked input arrays
+
+    :param baseline: Results of baseline_scenario for the same inputs, by
+        default simulated
+    :param memoize: Look the baseline up in, and add it to, the memo of
+        baseline_scenario when it is not given
+    :return: dict of result arrays keyed by their final_df column
+    """
+    if baseline is None:
+        baseline = (baseline_scenario if memoize else simulate_baseline_scenario)(
+            coefficients,
+            outdoor=outdoor,
+            SR=SR,
+            occupancy=occupancy,
+            neutral=neutral,
+            upper=upper,
+            AC_size=AC_size,
+            T_setpoint=T_setpoint,
+        )
+    T_spc, Q_spc = simulate_solar_precool(
+        coefficients,
+        outdoor=outdoor,
+        SR=SR,
+        surplus_PV=surplus_PV,
+        occupancy=occupancy,
+        neutral=neutral,
+        upper=upper,
+        lower=lower,
+        AC_size=AC_size,
+        cop=cop,
+        T_setpoint=T_setpoint,
+    )
+    return {
+        "T_bs": baseline["T_bs"],
+        "Q_bs": baseline["Q_bs"],
+        "W_bs": baseline["W_bs"],
+        "T_spc": T_spc,
+        "Q_spc": Q_spc,
+        "W_spc": discomfort(T_spc, upper, occupancy),
+    }
+
+
+def simulate_heating_scenarios(
+    coefficients,
+    AC_size,
+    outdoor,
+    SR,
+    surplus_PV,
+    occupancy,
+    night_setpoint,
+    day_setpoint,
+    upper,
+    lower,
+    cop,
+):
+    """Runs the baseline heating and solar pre-heating kernels over stacked arrays
+
+    The results use the same final_df columns as the cooling scenarios, and
+    discomfort is counted below the lower limit.
+
+    :return: dict of result arrays keyed by their final_df column
+    """
+    T_bs, Q_bs = simulate_baseline_winter(
+        coefficients,
+        outdoor=outdoor,
+        SR=SR,
+        night_setpoint=night_setpoint,
+        day_setpoint=day_setpoint,
+        AC_size=AC_size,
+    )
+    T_spc, Q_spc = simulate_solar_preheat(
+        coefficients,
+        outdoor=outdoor,
+        SR=SR,
+        surplus_PV=surplus_PV,
+        night_setpoint=night_setpoint,
+        day_setpoint=day_setpoint,
+        upper=upper,
+        AC_size=AC_size,
+        cop=cop,
+    )
+    return {
+        "T_bs": T_bs,
+        "Q_bs": Q_bs,
+        "W_bs": heating_discomfort(T_bs, lower, occupancy),
+        "T_spc": T_spc,
+        "Q_spc": Q_spc,
+        "W_spc": heating_discomfort(T_spc, lower, occupancy),
+    }
+
+
+def unpack_coefficient_stack(coefficients):
+    """Unpacks a stack of coefficient vectors into (buildings × 1) arrays
+
+    :param coefficients: DataFrame with one row per building, or a list of
+        model.params Series returned by create_thermal_model
+    """
+    coefficients = pd.DataFrame(coefficients)
+    return tuple(
+        coefficients[name].to_numpy(dtype=float)[:, np.newaxis]
+        for name in ARX_COEFFICIENTS
+    )
+
+
+def simulate_buildings(
+    coefficients,
+    AC_sizes,
+    ready_dfs,
+    neutral,
+    upper,
+    lower,
+    occupancy_checklist=(1, 3, 4),
+    cop=3.5,
+    setpoint="Neutral",
+    names=None,
+    workers=1,
+):
+    """Simulates the summer of many buildings in one pass
+
+    The inputs of all buildings are stacked into (buildings × days × hours)
+    tensors and both strategies are advanced one hour step at a time for
+    every building and day together.
+
+    :param coefficients: Stack of thermal coefficient vectors, one per building
+    :param AC_sizes: Thermal capacity of the AC of each building [kW]
+    :param ready_dfs: ready_df of each building, as returned by join_PV_load_temp
+    :param names: Labels of the buildings in the results. Defaults to 0..n-1
+    :param workers: Number of worker processes the buildings are split
+        across (see simulate_in_workers)
+    :return: Tidy DataFrame with the summer rows of every building, a
+        "building" column and the same result columns as final_df
+    """
+    names = range(len(ready_dfs)) if names is None else names
+    frames = [summer_rows(ready_df) for ready_df in ready_dfs]
+    shape = (
+        len(frames),
+        max(day.max() for _, day, _ in frames) + 1,
+        max(position.max() for _, _, position in frames) + 1,
+    )
+
+    def stack(column):
+        tensor = np.full(shape, np.nan)
+        for b, (summer, day, position) in enumerate(frames):
+            tensor[b, day, position] = summer[column].to_numpy(dtype=float)
+        return tensor
+
+    occupancy = occupancy_profile(occupancy_checklist, shape[-1])
+    setpoint_dic = {"Neutral": neutral, "Upper": upper}
+    results = simulate_in_workers(
+        simulate_cooling_scenarios,
+        dict(
+            occupancy=occupancy,
+            neutral=neutral,
+            upper=upper,
+            lower=lower,
+            cop=cop,
+            T_setpoint=setpoint_dic[setpoint],
+        ),
+        dict(
+            coefficients=unpack_coefficient_stack(coefficients),
+            AC_size=np.asarray(AC_sizes, dtype=float)[:, np.newaxis],
+            outdoor=stack("outdoor"),
+            SR=stack("SR"),
+            surplus_PV=stack("Surplus_PV"),
+        ),
+        workers,
+    )
+
+    tables = []
+    for b, (name, (summer, day, position)) in enumerate(zip(names, frames)):
+        table = summer.reset_index(drop=True)
+        table.insert(0, "building", name)
+        table["Occupancy"] = occupancy[position]
+        for column in RESULT_COLUMNS:
+            table[column] = results[column][b, day, position]
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
 
 def join_PV_load_temp(PV, load_temp, real_demand):
     joined_df = PV.merge(load_temp, on=["month", "day", "hour"])
@@ -555,41 +1312,79 @@ def join_PV_load_temp(PV, load_temp, real_demand):
     return joined_df
 
 
-def run_scenarios(building):
-
-    available_dates = building.ready_df.date.unique()
+def run_scenarios(
+    building,
+    batched=True,
+    optimal=False,
+    mpc=False,
+    full_year=False,
+    cache=None,
+    workers=1,
+):
+    """Simulates the baseline and solar pre-cooling scenarios for the summer
+
+    :param batched: Simulate all summer days together as (days × hours)
+        matrices. Otherwise, the days are simulated one at a time.
+    :param full_year: Also simulate the baseline heating and solar
+        pre-heating of the HEATING_MONTHS, so that annual savings and
+        emissions come out of the same run
+    :param optimal: Also solve the optimal day-ahead pre-cooling (see
+        OptimalControl.optimal_precool), reported with the "_opt" suffix
+    :param mpc: Also run the receding-horizon controller (see
+        OptimalControl.mpc_precool), reported with the "_mpc" suffix
+    :param cache: ResultCache.ResultCache from which the results are loaded
+        when the same inputs were run before
+    :param workers: Number of worker processes the batched days are split
+        across, None for one per CPU. The results do not depend on it.
+    """
+    if full_year and (optimal or mpc):
+        raise ValueError("The optimal and MPC strategies only cover the summer")
+    if cache is not None:
+        key = cache.key(building, optimal=optimal, mpc=mpc, full_year=full_year)
+        if cache.load(key, building):
+            print("scenarios are loaded from the result cache!")
+            return building
     building.ready_df["Occupancy"] = 0
-    for date in available_dates:
-
-        building.SH_ahead = building.ready_df[building.ready_df["date"] == date]
-        building.SH_ahead.reset_index(inplace=True, drop=True)
-        building.create_occupancy_column()
-        datetime = pd.to_datetime(date)
-        if datetime.month in [12, 1, 2, 9, 10, 11]:
-            building.baseline_summer(
-                neutral=building.neutral_temp,
-                upper=building.upper_limit,
-                setpoint="Neutral",
-            )
-            building.solar_precool(
-                neutral=building.neutral_temp,
-                lower=building.lower_limit,
-                upper=building.upper_limit,
-                setpoint="Neutral",
-            )
-            building.daily_results_dic[date] = building.SH_ahead
-            building.final_df = pd.concat([building.final_df, building.SH_ahead])
+    if batched and full_year:
+        building.simulate_year(workers=workers)
+    elif batched:
+        building.simulate_summer(workers=workers)
+    else:
+        building.simulate_days(full_year)
+    if optimal:
+        from OptimalControl import optimal_precool
+
+        optimal_precool(building)
+    if mpc:
+        from OptimalControl import mpc_precool
+
+        mpc_precool(building)
+    building = aggregate_scenarios(building)
+    if cache is not None:
+        cache.save(key, building)
+    return building
+
+
+def aggregate_scenarios(building, emission_df=None, dump_csv=True):
+    """Adds the emissions, imports, exports and savings to the simulated final_df
+
+    :param emission_df: Emission intensity returned by read_emission_intensity,
+        read if not given
+    :param dump_csv: Also write the averaged hourly results and final_df to
+        the CSV files of the working directory
+    """
+    # Columns of the simulated trajectories, kept by reprice_scenarios
+    building.simulated_columns = list(building.final_df.columns)
     print("hi")
-    building = add_emission_column(
-        building,
-    )
+    building = add_emission_column(building, emission_df)
     building.calculate_imports_exports()
     print("Imports exports OK")
 
-    building.groupby_final_results()
+    building.groupby_final_results(dump_csv)
     print("groupby final results Ok")
-    building.calculate_savings()
+    building.calculate_savings(dump_csv)
     print("Calculate savings Ok")
+    building.store_daily_results()
 
     # building.final_df.to_csv("Final_df_results.csv")
 
@@ -597,24 +1392,108 @@ def run_scenarios(building):
     return building
 
 
-def add_emission_column(building):
+def stream_scenarios(building, full_year=False, days=15, emission_df=None):
+    """Generator version of run_scenarios that yields each simulated day
+
+    The days are simulated in batches of days (see Building.iterate_days).
+    After each day, (date, day_df, totals) is yielded, where totals holds
+    the number of days simulated so far and the running total_cost_Savings
+    and discomfort W_bs, W_spc. The running savings use the Tariff and FiT
+    columns of ready_df and count every simulated hour. Once the generator
+    is exhausted, the building is aggregated as by run_scenarios.
+
+    :param full_year: Also simulate the HEATING_MONTHS
+    :param emission_df: Emission intensity returned by read_emission_intensity,
+        read if not given
+    """
+    building.ready_df["Occupancy"] = 0
+    totals = {"days": 0, "total_cost_Savings": 0.0, "W_bs": 0.0, "W_spc": 0.0}
+    for date, day_df in building.iterate_days(full_year, days=days):
+        Q = day_df[["Q_bs", "Q_spc"]].to_numpy(dtype=float)
+        W = day_df[["W_bs", "W_spc"]].to_numpy(dtype=float)
+        demand, PV, tariff, FiT = (
+            day_df[column].to_numpy(dtype=float)[:, np.newaxis]
+            for column in ["Demand", "PV", "Tariff", "FiT"]
+        )
+        net = demand + np.abs(Q) / building.cop - PV
+        cost = (np.clip(net, 0, None) * tariff + np.clip(net, None, 0) * FiT).sum(0)
+        totals["days"] += 1
+        totals["total_cost_Savings"] += cost[0] - cost[1]
+        totals["W_bs"] += W[:, 0].sum()
+        totals["W_spc"] += W[:, 1].sum()
+        yield date, day_df, dict(totals)
+    aggregate_scenarios(building, emission_df)
+
+
+def reprice_scenarios(building, tariff_id, tariff_dicts=None, emission_df=None):
+    """Recomputes the costs and emissions of a simulated building for a tariff
+
+    The baseline and solar pre-cooling (or pre-heating) controllers do not
+    use the Tariff or FiT, so their trajectories in final_df are kept and
+    only the emission, import/export and savings stages of
+    aggregate_scenarios run again, without the CSV dumps. The optimal and
+    MPC strategies minimise the cost under the tariff, so they are solved
+    again for the new one, with the default settings used by run_scenarios.
+
+    :param building: Building returned by run_scenarios or stream_scenarios
+    :param tariff_id: "Tariff ID" in RetailTariffs.json
+    :param tariff_dicts: Tariffs returned by functions.read_tariffs, read if
+        not given
+    :param emission_df: Emission intensity returned by read_emission_intensity,
+        by default the one already merged into final_df
+    """
+    if tariff_dicts is None:
+        tariff_dicts = functions.read_tariffs()
+    if emission_df is None:
+        emission_df = building.final_df[["Emission_intensity", "month", "day", "hour"]]
+    strategies = building.optional_strategies()
+    optional_columns = [
+        "{}_{}".format(result, strategy)
+        for strategy in strategies
+        for result in ["T", "Q", "W"]
+    ]
+    columns = [c for c in building.simulated_columns if c not in optional_columns]
+    functions.apply_tariff(building.ready_df, tariff_id, tariff_dicts)
+    building.final_df = functions.apply_tariff(
+        building.final_df[columns].copy(), tariff_id, tariff_dicts
+    )
+    if "opt" in strategies:
+        from OptimalControl import optimal_precool
+
+        optimal_precool(building)
+    if "mpc" in strategies:
+        from OptimalControl import mpc_precool
+
+        mpc_precool(building)
+    building.daily_results_dic = {}
+    return aggregate_scenarios(building, emission_df, dump_csv=False)
+
+
+def read_emission_intensity(city):
+    """Reads the hourly emission intensity of the region of the city [kg/kWh]"""
     emission_df = pd.read_csv("Data/hourly_emission_for_SPCaH_average_emissions.csv")
     emission_df["Region"] = emission_df["Region"].replace(["NSW"], "Sydney")
     emission_df["Region"] = emission_df["Region"].replace(["VIC"], "Melbourne")
     emission_df["Region"] = emission_df["Region"].replace(["SA"], "Adelaide")
     emission_df["Region"] = emission_df["Region"].replace(["QLD"], "Brisbane")
 
-    emission_df = emission_df[emission_df["Region"] == building.city]
+    emission_df = emission_df[emission_df["Region"] == city]
     emission_df.Date = pd.to_datetime(emission_df.Date)
     emission_df["day"] = emission_df.Date.dt.day
     emission_df["month"] = emission_df.Date.dt.month
     emission_df.rename(
         columns={"Hour": "hour", "Zero": "Emission_intensity"}, inplace=True
     )
+    return emission_df[["Emission_intensity", "month", "day", "hour"]]
+
+
+def add_emission_column(building, emission_df=None):
     # joined_df = PV.merge(load_temp, on=["month", "day", "hour"])
+    if emission_df is None:
+        emission_df = read_emission_intensity(building.city)
 
     building.final_df = building.final_df.merge(
-        emission_df[["Emission_intensity", "month", "day", "hour"]],
+        emission_df,
         on=["month", "day", "hour"],
     )
     print(building.final_df.columns)
@@ -0,0 +1,98 @@
+import numpy as np
+
+from DevelopThermalDynamicsModel import (
+    START_HOUR,
+    discomfort,
+    free_temperature,
+    occupancy_profile,
+    summer_rows,
+    to_day_matrix,
+    unpack_coefficients,
+)
+
+
+def impulse_response(coefficients, hours):
+    """Indoor temperature response to 1 kW of AC thermal power in one hour
+
+    :param coefficients: tuple of scalars returned by unpack_coefficients
+    :return: Array h, where h[k] is the temperature change k hours later
+    """
+    o1, t1, s1, q1, q0, o0, s0, o2, t2, q2, s2, const = coefficients
+    h = np.zeros(hours)
+    inputs = (q0, q1, q2)
+    for k in range(hours):
+        h[k] = inputs[k] if k < 3 else 0.0
+        if k > 0:
+            h[k] += t1 * h[k - 1]
+        if k > 1:
+            h[k] += t2 * h[k - 2]
+    return h
+
+
+def response_matrix(h):
+    """Lower-triangular Toeplitz matrix G with G[i, j] = h[i - j] for i >= j"""
+    lag = np.subtract.outer(np.arange(h.size), np.arange(h.size))
+    return np.where(lag >= 0, h[np.clip(lag, 0, None)], 0.0)
+
+
+class ThermalResponse:
+    """Superposition form of the linear ARX thermal model
+
+    Because the model is linear, the indoor temperature of a day is the
+    free-floating trajectory plus the convolution of the AC input with the
+    impulse response of the model:
+
+        T = T_free + Q @ G.T
+
+    T_free and G are computed once per building and set of days, so a
+    candidate AC schedule costs one matrix product instead of re-running the
+    hourly recurrence. As in the simulations, the AC input before START_HOUR
+    is ignored.
+    """
+
+    def __init__(self, thermal_coefficients, outdoor, SR, neutral):
+        """
+        :param thermal_coefficients: model.params returned by create_thermal_model
+        :param outdoor: (days × hours) outdoor temperature
+        :param SR: (days × hours) solar radiation
+        :param neutral: Neutral temperature. Days start from rest at neutral - 1
+        """
+        self.coefficients = unpack_coefficients(thermal_coefficients)
+        self.free_temperature = free_temperature(
+            self.coefficients, outdoor, SR, neutral
+        )
+
+        self.impulse_response = impulse_response(self.coefficients, outdoor.shape[-1])
+        self.response_matrix = response_matrix(self.impulse_response)
+        self.response_matrix[:, :START_HOUR] = 0
+
+    @classmethod
+    def from_building(cls, building):
+        """Builds the response of the summer days of a Building
+
+        :return: (response, summer, day, position), where day and position
+            locate each row of summer in the (days × hours) matrices
+        """
+        summer, day, position = summer_rows(building.ready_df)
+        outdoor, SR = (
+            to_day_matrix(summer[column].to_numpy(dtype=float), day, position)
+            for column in ["outdoor", "SR"]
+        )
+        response = cls(
+            building.thermal_coefficients, outdoor, SR, building.neutral_temp
+        )
+        return response, summer, day, position
+
+    def temperature(self, Q):
+        """Indoor temperature for AC schedules Q
+
+        :param Q: AC thermal power [kW], negative for cooling. The last two
+            axes are (days × hours) and any leading axes index schedules.
+        """
+        return self.free_temperature + Q @ self.response_matrix.T
+
+    def discomfort(self, Q, upper, occupancy_checklist):
+        """Total degree-hours above the upper limit of each schedule"""
+        occupancy = occupancy_profile(occupancy_checklist, Q.shape[-1])
+        W = discomfort(self.temperature(Q), upper, occupancy)
+        return np.nansum(W, axis=(-2, -1))
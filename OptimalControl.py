@@ -0,0 +1,317 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linprog
+
+from DevelopThermalDynamicsModel import (
+    START_HOUR,
+    discomfort,
+    free_response,
+    occupancy_profile,
+    stack_days,
+    temperature_step,
+    to_day_matrix,
+    unpack_coefficients,
+)
+from ImpulseResponse import ThermalResponse, impulse_response, response_matrix
+
+
+def pre_cooling_program(
+    G,
+    free,
+    tariff,
+    FiT,
+    demand,
+    PV,
+    occupied,
+    controllable,
+    upper,
+    lower,
+    AC_size,
+    cop,
+    discomfort_penalty,
+):
+    """Builds the linear program of the optimal pre-cooling of a set of days
+
+    The decision variables are the AC thermal power Q, imports I, exports X
+    and discomfort W of every hour, stacked as [Q, I, X, W]. The days share
+    the same response matrix, so the constraints are block diagonal.
+
+    :param G: (hours × hours) response matrix of T to Q
+    :param free: (days × hours) free-floating indoor temperature
+    :param tariff, FiT, demand, PV: (days × hours) matrices, NaN for padding
+    :param occupied, controllable: (days × hours) masks of the hours with a
+        comfort limit and of the hours in which the AC may run
+    :param discomfort_penalty: Cost of one degree-hour above the upper limit [$]
+    :return: dict of linprog arguments
+    """
+    days, hours = demand.shape
+    n = days * hours
+    valid = ~np.isnan(demand).ravel()
+    controllable = valid & controllable.ravel()
+    occupied = controllable & occupied.ravel()
+
+    free = np.nan_to_num(free.ravel())
+    G = sparse.kron(sparse.identity(days, format="csr"), sparse.csr_matrix(G)).tocsr()
+    identity = sparse.identity(n, format="csr")
+    empty = sparse.csr_matrix((n, n))
+
+    # Imports - exports + Q / cop = demand - PV (Q is negative for cooling)
+    A_eq = sparse.hstack([identity / cop, identity, -identity, empty])
+    b_eq = np.nan_to_num(demand.ravel() - PV.ravel())
+
+    # T - W <= upper while occupied, and no cooling below the lower limit
+    floor = np.minimum(lower, free)
+    A_ub = sparse.vstack(
+        [
+            sparse.hstack([G, empty, empty, -identity]).tocsr()[occupied],
+            sparse.hstack([-G, empty, empty, empty]).tocsr()[controllable],
+        ]
+    )
+    b_ub = np.concatenate([(upper - free)[occupied], (free - floor)[controllable]])
+
+    c = np.concatenate(
+        [
+            np.zeros(n),
+            np.nan_to_num(tariff.ravel()),
+            -np.nan_to_num(FiT.ravel()),
+            np.full(n, discomfort_penalty),
+        ]
+    )
+    PV_max = np.nan_to_num(PV.ravel())
+    bounds = np.concatenate(
+        [
+            np.column_stack([np.where(controllable, -AC_size, 0), np.zeros(n)]),
+            np.column_stack([np.zeros(n), np.where(valid, np.inf, 0)]),
+            np.column_stack([np.zeros(n), PV_max]),
+            np.column_stack([np.zeros(n), np.where(occupied, np.inf, 0)]),
+        ]
+    )
+    return dict(c=c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds)
+
+
+def solve_pre_cooling(program, shape):
+    """Solves a pre-cooling program with HiGHS and returns the (days × hours) Q"""
+    result = linprog(method="highs", **program)
+    if result.status != 0:
+        raise RuntimeError("Optimal pre-cooling failed: {}".format(result.message))
+    return result.x[: np.prod(shape)].reshape(shape)
+
+
+def final_df_matrices(building, columns):
+    """Scatters columns of building.final_df into (days × hours) matrices
+
+    :return: (matrices, day, position)
+    """
+    day, position = stack_days(building.final_df["date"])
+    matrices = {
+        column: to_day_matrix(
+            building.final_df[column].to_numpy(dtype=float), day, position
+        )
+        for column in columns
+    }
+    return matrices, day, position
+
+
+def optimal_precool(building, discomfort_penalty=100.0):
+    """Optimal day-ahead pre-cooling of all summer days in one linear program
+
+    Minimises the import cost of each day, using the Tariff and FiT columns
+    added by functions.process_tariff_rates, plus the penalised discomfort,
+    under the ARX dynamics, the AC capacity and the comfort band. The
+    results are added to building.final_df as T_opt, Q_opt and W_opt.
+
+    :param building: Building with final_df from the summer simulation
+    :param discomfort_penalty: Cost of one degree-hour above the upper limit [$]
+    """
+    matrices, day, position = final_df_matrices(
+        building, ["outdoor", "SR", "Tariff", "FiT", "Demand", "PV"]
+    )
+    response = ThermalResponse(
+        building.thermal_coefficients,
+        matrices["outdoor"],
+        matrices["SR"],
+        building.neutral_temp,
+    )
+    shape = matrices["Demand"].shape
+    occupancy = occupancy_profile(building.occupancy_checklist, shape[1])
+    controllable = np.broadcast_to(np.arange(shape[1]) >= START_HOUR, shape)
+
+    Q = solve_pre_cooling(
+        pre_cooling_program(
+            response.response_matrix,
+            response.free_temperature,
+            tariff=matrices["Tariff"],
+            FiT=matrices["FiT"],
+            demand=matrices["Demand"],
+            PV=matrices["PV"],
+            occupied=controllable & (occupancy == 1),
+            controllable=controllable,
+            upper=building.upper_limit,
+            lower=building.lower_limit,
+            AC_size=building.AC_size,
+            cop=building.cop,
+            discomfort_penalty=discomfort_penalty,
+        ),
+        shape,
+    )
+    T = response.temperature(Q)
+    building.final_df["T_opt"] = T[day, position]
+    building.final_df["Q_opt"] = Q[day, position]
+    building.final_df["W_opt"] = discomfort(T, building.upper_limit, occupancy)[
+        day, position
+    ]
+    return building
+
+
+def previous_days(dates, day):
+    """Row of the previous calendar day of each row of the day matrices
+
+    :param dates: Date of each hourly row, as final_df["date"]
+    :param day: Day of each hourly row, as returned by stack_days
+    :return: Array of the row of the previous day of every row, -1 where
+        the previous day is not in the matrices
+    """
+    first = np.unique(day, return_index=True)[1]
+    days = pd.to_datetime(pd.Series(dates).iloc[first].to_numpy()).normalize()
+    rows = pd.Series(np.arange(len(days)), index=days)
+    previous = rows.reindex(days - pd.Timedelta(days=1))
+    return previous.fillna(-1).to_numpy(dtype=int)
+
+
+def forecast_inputs(
+    truth, hour, length, method, rng, temperature_error, PV_error, previous=None
+):
+    """Forecasts outdoor temperature, SR and PV from hour over the horizon
+
+    :param truth: dict of (days × hours) matrices of the actual inputs
+    :param method: "perfect" (actual values), "persistence" (same hours of
+        the previous calendar day) or "noisy" (actual values with errors
+        that grow with the lead time)
+    :param temperature_error: Standard deviation of the 1 h ahead outdoor
+        temperature error of the noisy forecast [°C]
+    :param PV_error: Relative standard deviation of the 1 h ahead PV and SR
+        error of the noisy forecast
+    :param previous: Row of the previous day of every row, as returned by
+        previous_days, needed by the persistence forecast. The days without
+        a previous day, and the hours it does not have, are forecast with
+        the actual values.
+    :return: dict of (days × length) matrices
+    """
+    window = slice(hour, hour + length)
+    forecast = {column: truth[column][:, window] for column in ["outdoor", "SR", "PV"]}
+    if method == "persistence":
+        if previous is None:
+            raise ValueError("The persistence forecast needs the previous days")
+        forecast = {
+            column: persistence(truth[column][:, window], previous)
+            for column in forecast
+        }
+    elif method == "noisy":
+        shape = forecast["outdoor"].shape
+        growth = np.sqrt(np.arange(1, length + 1))
+        cloud = 1 + PV_error * growth * rng.standard_normal(shape)
+        forecast = {
+            "outdoor": forecast["outdoor"]
+            + temperature_error * growth * rng.standard_normal(shape),
+            "SR": np.clip(forecast["SR"] * cloud, 0, None),
+            "PV": np.clip(forecast["PV"] * cloud, 0, None),
+        }
+    elif method != "perfect":
+        raise ValueError("Unknown forecast method: {}".format(method))
+    return forecast
+
+
+def persistence(values, previous):
+    """Values of the previous day of every row, the actual ones where it is missing"""
+    yesterday = values[previous]
+    missing = (previous < 0)[:, np.newaxis] | np.isnan(yesterday)
+    return np.where(missing, values, yesterday)
+
+
+def mpc_precool(
+    building,
+    horizon=12,
+    forecast="persistence",
+    discomfort_penalty=100.0,
+    temperature_error=1.0,
+    PV_error=0.2,
+    seed=0,
+):
+    """Receding-horizon (model predictive) pre-cooling of all summer days
+
+    Every hour from START_HOUR, the AC schedule of the next horizon hours is
+    optimised with forecast outdoor temperature, SR and PV, and only its
+    first hour is applied to the actual inputs. The days are independent,
+    so the horizon problems of all days are solved together as one block
+    diagonal program per hour, and the response matrices of each horizon
+    length are built once. The results are added to building.final_df as
+    T_mpc, Q_mpc and W_mpc.
+
+    :param horizon: Number of hours optimised at each step
+    :param forecast: Forecast method, see forecast_inputs
+    :param seed: Seed of the errors of the noisy forecast
+    """
+    truth, day, position = final_df_matrices(
+        building, ["outdoor", "SR", "Tariff", "FiT", "Demand", "PV"]
+    )
+    coefficients = unpack_coefficients(building.thermal_coefficients)
+    shape = truth["Demand"].shape
+    occupancy = occupancy_profile(building.occupancy_checklist, shape[1])
+    rng = np.random.default_rng(seed)
+    previous = previous_days(building.final_df["date"], day)
+    if forecast == "persistence" and (previous < 0).any():
+        print(
+            "{} days without their previous day are forecast with the actual "
+            "inputs".format((previous < 0).sum())
+        )
+
+    G = response_matrix(impulse_response(coefficients, horizon))
+    T = np.empty(shape)
+    Q = np.zeros(shape)
+    T[:, :START_HOUR] = building.neutral_temp - 1
+    for hour in range(START_HOUR, shape[1]):
+        length = min(horizon, shape[1] - hour)
+        window = slice(hour, hour + length)
+        predicted = forecast_inputs(
+            truth, hour, length, forecast, rng, temperature_error, PV_error, previous
+        )
+
+        # Free-floating temperature from the actual history and the forecast
+        outdoor, SR = truth["outdoor"].copy(), truth["SR"].copy()
+        outdoor[:, window], SR[:, window] = predicted["outdoor"], predicted["SR"]
+        free = free_response(
+            coefficients, outdoor, SR, T.copy(), Q.copy(), hour, hour + length
+        )[:, window]
+
+        plan = solve_pre_cooling(
+            pre_cooling_program(
+                G[:length, :length],
+                free,
+                tariff=truth["Tariff"][:, window],
+                FiT=truth["FiT"][:, window],
+                demand=truth["Demand"][:, window],
+                PV=predicted["PV"],
+                occupied=np.broadcast_to(occupancy[window] == 1, free.shape),
+                controllable=np.ones(free.shape, dtype=bool),
+                upper=building.upper_limit,
+                lower=building.lower_limit,
+                AC_size=building.AC_size,
+                cop=building.cop,
+                discomfort_penalty=discomfort_penalty,
+            ),
+            free.shape,
+        )
+
+        # Apply the first hour of the plan to the actual inputs
+        Q[:, hour] = plan[:, 0]
+        T[:, hour] = temperature_step(
+            coefficients, truth["outdoor"], truth["SR"], T, Q, hour
+        )
+
+    building.final_df["T_mpc"] = T[day, position]
+    building.final_df["Q_mpc"] = Q[day, position]
+    building.final_df["W_mpc"] = discomfort(T, building.upper_limit, occupancy)[
+        day, position
+    ]
+    return building
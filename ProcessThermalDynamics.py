@@ -2,6 +2,8 @@ import logging
 
 import pandas as pd
 
+from WeatherLibrary import read_climate, weather_frame
+
 # flake8: noqa
 logger = logging.getLogger(__name__)
 
@@ -145,75 +147,12 @@ dic_zones = {
 
 
 def read_TMY_weather_files(city, all_fields=False):
-    climate_zones_list = {"Melbourne": 62, "Brisbane": 10, "Adelaide": 16, "Sydney": 56}
-
-    weather = pd.read_fwf(
-        "Data/TMY/climat{}.txt".format(climate_zones_list[city]),
-        widths=[
-            2,
-            2,
-            2,
-            2,
-            2,
-            4,
-            3,
-            4,
-            3,
-            2,
-            1,
-            1,
-            1,
-            1,
-            1,
-            1,
-            1,
-            4,
-            3,
-            4,
-            2,
-            3,
-            1,
-            1,
-            5,
-            5,
-            20,
-        ],
-        header=None,
-    )
+    """Weather of the TMY climate file of a city, see WeatherLibrary.read_climate"""
     if all_fields == False:
-        # print("Hi")
-        weather = weather.iloc[:, 17:18]
-        weather.columns = ["SR"]
-        return weather
+        return pd.DataFrame({"SR": read_climate(city)["GHI"]})
 
     elif all_fields == True:
-        # weather = weather.iloc[:, 17:22]
-        weather = weather.iloc[
-            :,
-            [1, 2, 3, 4, 5, 8, 17, 18, 19, 20, 21],
-        ]
-        weather.columns = [
-            "year",
-            "month",
-            "day",
-            "hour",
-            "DBT",
-            "Wspd",
-            "GHI",
-            "DHI",
-            "DNI",
-            "Altitude",
-            "Azimuth",
-        ]
-        weather[["DBT", "Wspd"]] = weather[["DBT", "Wspd"]] / 10
-        # weather["year"] = 2020
-        weather.loc[weather["year"] > 30, "year"] = weather["year"] + 1900
-        weather.loc[weather["year"] <= 30, "year"] = weather["year"] + 2000
-
-        weather["DateTime"] = pd.to_datetime(weather[["year", "month", "day", "hour"]])
-        weather.set_index("DateTime", inplace=True, drop=True)
-
-        return weather
+        return weather_frame(city)
 
 
 def convert_raw_to_csv():
@@ -339,8 +278,6 @@ def process_medium_houses(city, starRating, weight):
         "wc": 1.65,
     }
     total_area = 148.5
-    climate_zones_list = {"Melbourne": 62, "Brisbane": 10, "Adelaide": 16, "Sydney": 56}
-    climateZone = climate_zones_list[city]
     main_df = pd.read_csv(
         "Data/MediumHouse/{}_wc_{}_{}.csv".format(
             city.lower(), weight.lower(), starRating
@@ -385,40 +322,7 @@ def process_medium_houses(city, starRating, weight):
     main_df["agg_AC"] = main_df["Heating_m"] - main_df["Cooling_m"]
 
     main_df = main_df[["month", "day", "hour", "T_m", "outdoor", "agg_AC"]]
-    weather = pd.read_fwf(
-        "Data/TMY/climat{}.txt".format(climateZone),
-        widths=[
-            2,
-            2,
-            2,
-            2,
-            2,
-            4,
-            3,
-            4,
-            3,
-            2,
-            1,
-            1,
-            1,
-            1,
-            1,
-            1,
-            1,
-            4,
-            3,
-            4,
-            2,
-            3,
-            1,
-            1,
-            5,
-            5,
-            20,
-        ],
-        header=None,
-    )
-    main_df["SR"] = weather[17].values
+    main_df["SR"] = read_climate(city)["GHI"]
     main_df.rename(columns={"T_m": "agg_temp"}, inplace=True)
     main_df.reset_index(drop=True, inplace=True)
     # print(main_df.head(25))
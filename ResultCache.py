@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from DevelopThermalDynamicsModel import ARX_COEFFICIENTS
+
+# Columns of ready_df that the scenarios and their costs depend on
+INPUT_COLUMNS = [
+    "date",
+    "month",
+    "day",
+    "hour",
+    "outdoor",
+    "SR",
+    "PV",
+    "Demand",
+    "Surplus_PV",
+    "Tariff",
+    "FiT",
+]
+
+# Results cached with another version are never looked up, so bump it
+# whenever the kernels, the aggregation or the savings change the results
+RESULT_VERSION = 1
+
+
+def data_fingerprint(directory="Data"):
+    """Path, size and modification time of every file in the data directory"""
+    fingerprint = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            status = os.stat(path)
+            fingerprint.append((path, status.st_size, status.st_mtime_ns))
+    return sorted(fingerprint)
+
+
+class ResultCache:
+    """Content-addressed least-recently-used cache of run_scenarios results
+
+    The results are stored on disk under a hash of everything they depend
+    on: the thermal coefficients, the ready_df inputs (including the Tariff
+    and FiT of the selected tariff), the comfort band, the occupancy, the AC
+    size, the city and the options of run_scenarios. The hash also covers
+    the files of the data directory and RESULT_VERSION, so that the results
+    are invalidated when these files or the simulation change. Hits and misses are counted on disk, so they
+    add up across the processes of the background callbacks.
+
+    :param directory: Directory of the cache
+    :param size_limit: Size of the cache on disk above which the least
+        recently used results are evicted [bytes]
+    :param data_directory: Directory of the data files read by run_scenarios
+    """
+
+    def __init__(
+        self, directory="result_cache", size_limit=2**30, data_directory="Data"
+    ):
+        import diskcache
+
+        self.cache = diskcache.Cache(
+            directory,
+            size_limit=size_limit,
+            eviction_policy="least-recently-used",
+        )
+        self.cache.stats(enable=True)
+        self.data_directory = data_directory
+
+    def key(self, building, **options):
+        """Hash of the inputs of run_scenarios for the building and options"""
+        digest = hashlib.sha256()
+        coefficients = building.thermal_coefficients[list(ARX_COEFFICIENTS)]
+        digest.update(coefficients.to_numpy(dtype=float).tobytes())
+        inputs = building.ready_df[INPUT_COLUMNS]
+        digest.update(
+            pd.util.hash_pandas_object(inputs, index=False).to_numpy().tobytes()
+        )
+        settings = (
+            RESULT_VERSION,
+            building.neutral_temp,
+            building.upper_limit,
+            building.lower_limit,
+            sorted(building.occupancy_checklist),
+            building.AC_size,
+            building.cop,
+            building.city,
+            sorted(options.items()),
+            data_fingerprint(self.data_directory),
+        )
+        digest.update(repr(settings).encode())
+        return digest.hexdigest()
+
+    def load(self, key, building):
+        """Sets the cached results of key on the building
+
+        :return: True on a hit, False on a miss
+        """
+        results = self.cache.get(key)
+        if results is None:
+            return False
+        for name, value in results.items():
+            setattr(building, name, value)
+        building.store_daily_results()
+        return True
+
+    def save(self, key, building):
+        """Stores the results of run_scenarios for key"""
+        # Everything aggregate_scenarios sets, which the figures and
+        # reprice_scenarios read
+        names = [
+            "final_df",
+            "averaged_hourly_results",
+            "monthly_saving",
+            "simulated_columns",
+        ]
+        names += [name for name in vars(building) if name.startswith("total_")]
+        self.cache.set(key, {name: getattr(building, name) for name in names})
+
+    def stats(self):
+        """Hits, misses, number of entries and size on disk [bytes] of the cache"""
+        hits, misses = self.cache.stats()
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / max(hits + misses, 1),
+            "entries": len(self.cache),
+            "size": self.cache.volume(),
+        }
+
+    def clear(self):
+        self.cache.clear()
+        self.cache.stats(reset=True)
@@ -0,0 +1,357 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from DevelopThermalDynamicsModel import (
+    baseline_scenario,
+    map_in_workers,
+    occupancy_profile,
+    read_emission_intensity,
+    simulate_cooling_scenarios,
+    summer_rows,
+    to_day_matrix,
+    unpack_coefficient_stack,
+    unpack_coefficients,
+)
+
+SWEEP_PARAMETERS = [
+    "AC_size",
+    "PV_capacity",
+    "neutral_temp",
+    "upper_limit",
+    "lower_limit",
+]
+
+
+def prepare_inputs(building, PV_capacity):
+    """Stacks the summer inputs of a Building once for repeated evaluations
+
+    :param building: Building with ready_df, including the Tariff and FiT
+        columns added by functions.process_tariff_rates, and its coefficients
+    :param PV_capacity: Rated PV capacity ready_df["PV"] was simulated for [kW]
+    :return: dict of (days × hours) input matrices and model settings
+    """
+    rows, day, position = summer_rows(building.ready_df)
+    emission = rows[["month", "day", "hour"]].merge(
+        read_emission_intensity(building.city),
+        on=["month", "day", "hour"],
+        how="left",
+    )
+    inputs = {
+        column: to_day_matrix(rows[column].to_numpy(dtype=float), day, position)
+        for column in ["outdoor", "SR", "PV", "Demand", "Tariff", "FiT"]
+    }
+    inputs["Emission_intensity"] = to_day_matrix(
+        emission["Emission_intensity"].to_numpy(dtype=float), day, position
+    )
+    # Hours that add_emission_column keeps in final_df
+    inputs["counted"] = ~np.isnan(inputs["Emission_intensity"])
+    inputs["coefficients"] = unpack_coefficients(building.thermal_coefficients)
+    inputs["occupancy"] = occupancy_profile(
+        building.occupancy_checklist, position.max() + 1
+    )
+    inputs["cop"] = building.cop
+    inputs["PV_capacity"] = PV_capacity
+    return inputs
+
+
+def season_metrics(inputs, results, PV):
+    """Seasonal totals of the simulated scenarios, as in calculate_savings
+
+    :param results: Result arrays returned by simulate_cooling_scenarios
+    :param PV: PV generation of the scenarios [kW]
+    :return: dict of arrays with one value per scenario
+    """
+
+    def energy(Q):
+        net = inputs["Demand"] + np.abs(Q) / inputs["cop"] - PV
+        imports = np.clip(net, 0, None)
+        exports = np.clip(-net, 0, None)
+        return imports, imports * inputs["Tariff"] - exports * inputs["FiT"]
+
+    def total(values):
+        return np.where(inputs["counted"], values, 0).sum(axis=(-2, -1))
+
+    imports_bs, cost_bs = energy(results["Q_bs"])
+    imports_spc, cost_spc = energy(results["Q_spc"])
+    return {
+        "total_cost_Savings": total(cost_bs - cost_spc),
+        "total_emission_reduction": total(
+            (imports_bs - imports_spc) * inputs["Emission_intensity"]
+        ),
+        "W_bs": total(results["W_bs"]),
+        "W_spc": total(results["W_spc"]),
+    }
+
+
+def evaluate(
+    inputs,
+    AC_size,
+    PV_capacity,
+    neutral_temp,
+    upper_limit,
+    lower_limit,
+    setpoint="Neutral",
+):
+    """Seasonal savings, emission reduction and discomfort of scenarios
+
+    AC_size and PV_capacity may be 1-D arrays of scenarios that share the
+    comfort band. They are simulated together along a leading axis, and the
+    PV generation is rescaled instead of simulated again. The baseline does
+    not depend on the PV or the lower limit, so it is simulated once per AC
+    size and memoized by baseline_scenario across calls.
+
+    :param inputs: dict returned by prepare_inputs
+    :return: dict of arrays with one value per scenario
+    """
+    AC_size, PV_capacity = np.broadcast_arrays(
+        np.atleast_1d(AC_size).astype(float), np.atleast_1d(PV_capacity).astype(float)
+    )
+    shape = AC_size.shape + inputs["PV"].shape
+    PV = inputs["PV"] * (PV_capacity / inputs["PV_capacity"])[:, None, None]
+    setpoint_dic = {"Neutral": neutral_temp, "Upper": upper_limit}
+
+    baseline = None
+    if np.ndim(inputs["coefficients"][0]) == 0:
+        sizes, scenario = np.unique(AC_size, return_inverse=True)
+        baseline_shape = sizes.shape + inputs["PV"].shape
+        baseline = baseline_scenario(
+            inputs["coefficients"],
+            outdoor=np.broadcast_to(inputs["outdoor"], baseline_shape),
+            SR=np.broadcast_to(inputs["SR"], baseline_shape),
+            occupancy=inputs["occupancy"],
+            neutral=neutral_temp,
+            upper=upper_limit,
+            AC_size=sizes[:, None],
+            T_setpoint=setpoint_dic[setpoint],
+        )
+        baseline = {column: values[scenario] for column, values in baseline.items()}
+
+    results = simulate_cooling_scenarios(
+        inputs["coefficients"],
+        AC_size=AC_size[:, None],
+        outdoor=np.broadcast_to(inputs["outdoor"], shape),
+        SR=np.broadcast_to(inputs["SR"], shape),
+        surplus_PV=np.clip(PV - inputs["Demand"], 0, None),
+        occupancy=inputs["occupancy"],
+        neutral=neutral_temp,
+        upper=upper_limit,
+        lower=lower_limit,
+        cop=inputs["cop"],
+        T_setpoint=setpoint_dic[setpoint],
+        baseline=baseline,
+    )
+    return season_metrics(inputs, results, PV)
+
+
+def _evaluate_task(inputs, task):
+    return evaluate(inputs, *task)
+
+
+def _evaluate_draws(inputs, task):
+    coefficients, *parameters = task
+    return evaluate(dict(inputs, coefficients=coefficients), *parameters)
+
+
+def sweep(
+    building,
+    PV_capacity,
+    AC_sizes=None,
+    PV_capacities=None,
+    neutral_temps=None,
+    upper_limits=None,
+    lower_limits=None,
+    workers=1,
+):
+    """Savings, emissions and discomfort over a grid of sizes and comfort bands
+
+    Every combination of the given values is simulated. Parameters that are
+    not given keep the current value of the building. The inputs are
+    stacked once for the whole grid, the combinations that share a comfort
+    band are simulated together, and with several workers the comfort bands
+    run in parallel in worker processes that receive the inputs once.
+
+    :param building: Building prepared as for run_scenarios
+    :param PV_capacity: Rated PV capacity ready_df["PV"] was simulated for [kW]
+    :param AC_sizes: Thermal capacities of the AC [kW], as Building.AC_size
+    :param PV_capacities: Rated PV capacities [kW]
+    :param workers: Number of worker processes, None for one per CPU and 1
+        to run in this process
+    :return: DataFrame with one row per combination
+    """
+    grid = {
+        "AC_size": [building.AC_size] if AC_sizes is None else AC_sizes,
+        "PV_capacity": [PV_capacity] if PV_capacities is None else PV_capacities,
+        "neutral_temp": [building.neutral_temp]
+        if neutral_temps is None
+        else neutral_temps,
+        "upper_limit": [building.upper_limit] if upper_limits is None else upper_limits,
+        "lower_limit": [building.lower_limit] if lower_limits is None else lower_limits,
+    }
+    inputs = prepare_inputs(building, PV_capacity)
+    sizes = np.array(
+        list(itertools.product(grid["AC_size"], grid["PV_capacity"])), dtype=float
+    )
+    bands = list(
+        itertools.product(
+            grid["neutral_temp"], grid["upper_limit"], grid["lower_limit"]
+        )
+    )
+    tasks = [(sizes[:, 0], sizes[:, 1]) + band for band in bands]
+
+    metrics = map_in_workers(_evaluate_task, inputs, tasks, workers)
+
+    tables = []
+    for task, result in zip(tasks, metrics):
+        table = pd.DataFrame(dict(zip(SWEEP_PARAMETERS, task)))
+        for name, values in result.items():
+            table[name] = values
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def coefficient_uncertainty(
+    building,
+    draws=500,
+    confidence=0.95,
+    seed=0,
+    covariance=None,
+    chunk=100,
+    workers=1,
+):
+    """Monte Carlo confidence intervals of the savings from the fitted model
+
+    Coefficient vectors are drawn from the normal distribution of the OLS
+    estimate and the summer is simulated for all of them at once, chunk
+    draws at a time, along a leading axis.
+
+    :param building: Building prepared as for run_scenarios
+    :param draws: Number of coefficient vectors
+    :param confidence: Probability covered by the intervals
+    :param seed: Seed of the draws
+    :param covariance: Covariance of the coefficients, by default the
+        building.thermal_covariance kept by create_thermal_model
+    :param chunk: Number of draws simulated together
+    :param workers: Number of worker processes the chunks are split
+        across, None for one per CPU. The results do not depend on it.
+    :return: (intervals, samples) DataFrames with the mean, standard
+        deviation and interval of each result, and the result of every draw
+    """
+    if covariance is None:
+        covariance = building.thermal_covariance
+    if covariance is None:
+        raise ValueError("The coefficient covariance of the building is unknown")
+    mean = building.thermal_coefficients
+    covariance = pd.DataFrame(covariance).loc[mean.index, mean.index]
+    rng = np.random.default_rng(seed)
+    coefficients = unpack_coefficient_stack(
+        pd.DataFrame(
+            rng.multivariate_normal(mean.to_numpy(), covariance.to_numpy(), draws),
+            columns=mean.index,
+        )
+    )
+
+    inputs = prepare_inputs(building, 1.0)
+    tasks = []
+    for start in range(0, draws, chunk):
+        draw = slice(start, start + chunk)
+        tasks.append(
+            (
+                tuple(values[draw] for values in coefficients),
+                np.full(coefficients[0][draw].shape[0], building.AC_size),
+                1.0,
+                building.neutral_temp,
+                building.upper_limit,
+                building.lower_limit,
+            )
+        )
+    metrics = map_in_workers(_evaluate_draws, inputs, tasks, workers)
+    samples = pd.concat([pd.DataFrame(m) for m in metrics], ignore_index=True)
+
+    tail = (1 - confidence) / 2
+    intervals = pd.DataFrame(
+        {
+            "mean": samples.mean(),
+            "std": samples.std(),
+            "lower": samples.quantile(tail),
+            "upper": samples.quantile(1 - tail),
+        }
+    )
+    return intervals, samples
+
+
+# Results that meet a target when they are at most, not at least, its value
+DISCOMFORT_METRICS = ["W_bs", "W_spc"]
+
+
+def size_for_target(
+    building,
+    PV_capacity,
+    target,
+    metric="W_spc",
+    size="AC_size",
+    bounds=(0.5, 20.0),
+    tolerance=0.05,
+    inputs=None,
+):
+    """Smallest AC or PV capacity that meets a discomfort or savings target
+
+    The capacity is found by bisection, assuming the result improves with
+    the capacity. The inputs are stacked once and shared by all the
+    evaluations, and can be passed in to be shared between calls.
+
+    :param building: Building prepared as for run_scenarios
+    :param PV_capacity: Rated PV capacity ready_df["PV"] was simulated for [kW]
+    :param target: Largest discomfort [°C·h] or smallest savings [$, kg] to meet
+    :param metric: Result of evaluate compared with the target
+    :param size: "AC_size" or "PV_capacity", the other one is kept fixed
+    :param bounds: Range of capacities searched [kW]
+    :param tolerance: Width of the final bracket [kW]
+    :param inputs: dict returned by prepare_inputs for the building
+    :return: Series with the capacities, comfort band and results of the
+        smallest capacity found
+    """
+    if size not in ["AC_size", "PV_capacity"]:
+        raise ValueError("Unknown size: {}".format(size))
+    if inputs is None:
+        inputs = prepare_inputs(building, PV_capacity)
+    parameters = {
+        "AC_size": building.AC_size,
+        "PV_capacity": inputs["PV_capacity"],
+        "neutral_temp": building.neutral_temp,
+        "upper_limit": building.upper_limit,
+        "lower_limit": building.lower_limit,
+    }
+    evaluated = {}
+
+    def result(capacity):
+        if capacity not in evaluated:
+            parameters[size] = capacity
+            metrics = evaluate(inputs, *parameters.values())
+            evaluated[capacity] = pd.Series(
+                {**parameters, **{name: values[0] for name, values in metrics.items()}}
+            )
+        return evaluated[capacity]
+
+    def meets(capacity):
+        if metric in DISCOMFORT_METRICS:
+            return result(capacity)[metric] <= target
+        return result(capacity)[metric] >= target
+
+    low, high = bounds
+    if not meets(high):
+        raise ValueError(
+            "{} of {} does not reach the target with {} = {}".format(
+                metric, target, size, high
+            )
+        )
+    if meets(low):
+        return result(low)
+    while high - low > tolerance:
+        middle = (low + high) / 2
+        if meets(middle):
+            high = middle
+        else:
+            low = middle
+    return result(high)
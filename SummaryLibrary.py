@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from DataStore import (
+    DATA_STORE,
+    build_file,
+    new_build,
+    publish_index,
+    read_index,
+    source_stamp,
+    source_unchanged,
+)
+
+SAVINGS_WORKBOOK = "Data/Overview of the savings.xlsx"
+SAVINGS_COPY = os.path.join(DATA_STORE, "Overview of the savings")
+
+# Copies built with another version are ignored
+COPY_VERSION = 2
+
+# Column sorted by each field of table_of_savings and its displayed name
+SAVINGS_FIELDS = {
+    "saving": ("Maximum savings", "Potential cost savings ($/Summer)"),
+    "discomfort": (
+        "Discomfort reduction",
+        "Daily discomfort reduction (degree.hour)",
+    ),
+    "emission": ("Emission Reduction", "Emission Reduction (kg/summer)"),
+}
+
+_overview = {}
+_tables = {}
+
+
+def build_savings_copy(workbook=SAVINGS_WORKBOOK, copy=SAVINGS_COPY):
+    """Converts the savings workbook into a columnar copy, run offline
+
+    Every column is written as one .npy array, text columns as strings with
+    a mask of their empty cells, and index.json records the build, the
+    columns, their dtypes and the source_stamp of the workbook, see
+    publish_index.
+
+    :return: The index as a dict
+    """
+    df = pd.read_excel(workbook)
+    build = new_build(copy)
+    dtypes, text = {}, []
+    for number, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            # Object arrays cannot be saved without pickle
+            missing = df[column].isna().to_numpy()
+            np.save(build_file(copy, build, "{}_missing.npy".format(number)), missing)
+            values = df[column].fillna("").to_numpy().astype(str)
+            text.append(number)
+        np.save(build_file(copy, build, "{}.npy".format(number)), values)
+        dtypes[column] = values.dtype.str
+    index = {
+        "version": COPY_VERSION,
+        "build": build,
+        "source": source_stamp(workbook),
+        "columns": list(df.columns),
+        "dtypes": dtypes,
+        "text": text,
+    }
+    publish_index(copy, index)
+    print("Copy of {} written to {}".format(workbook, copy))
+    return index
+
+
+def read_savings_copy(copy=SAVINGS_COPY, workbook=SAVINGS_WORKBOOK):
+    """Overview of the savings from the copy built by build_savings_copy
+
+    :return: DataFrame as read from the workbook, or None if there is no
+        copy of this version or the workbook has changed since it was built
+    """
+    read = read_index(copy)
+    if read is None or read[1]["version"] != COPY_VERSION:
+        return None
+    index = read[1]
+    if not source_unchanged(workbook, index["source"]):
+        print("{} changed since its copy was built".format(workbook))
+        return None
+    columns = {}
+    try:
+        for number, column in enumerate(index["columns"]):
+            path = build_file(copy, index["build"], "{}.npy".format(number))
+            values = np.load(path)
+            if number in index["text"]:
+                values = values.astype(object)
+                missing = build_file(
+                    copy, index["build"], "{}_missing.npy".format(number)
+                )
+                values[np.load(missing)] = np.nan
+            columns[column] = values
+    except FileNotFoundError:
+        # Replaced by a newer build meanwhile
+        return None
+    return pd.DataFrame(columns, columns=index["columns"])
+
+
+def read_savings_overview(workbook=SAVINGS_WORKBOOK, copy=SAVINGS_COPY):
+    """Overview of the savings, read once per process
+
+    The workbook is only parsed when its copy is missing or stale, nothing
+    is written here, see build_savings_copy.
+
+    :return: DataFrame of the workbook, not to be modified
+    """
+    if workbook not in _overview:
+        df = read_savings_copy(copy, workbook)
+        if df is None:
+            df = pd.read_excel(workbook)
+        _overview[workbook] = df
+    return _overview[workbook]
+
+
+def savings_table(field, year=2022):
+    """Cumulative share of households by decreasing saving, memoized
+
+    :param field: "saving", "discomfort" or "emission", any other field
+        returns the whole overview
+    :param year: Year of the share of buildings
+    :return: DataFrame of % of households and the field, not to be modified
+    """
+    if (field, year) not in _tables:
+        df = read_savings_overview()
+        if field in SAVINGS_FIELDS:
+            column, name = SAVINGS_FIELDS[field]
+            df = df.sort_values(by=column, ascending=False)
+            df["% of households"] = (
+                df["Percentage of buildings {}".format(year)].cumsum().round(1)
+            )
+            df = df.rename(columns={column: name})[["% of households", name]]
+        _tables[(field, year)] = df
+    return _tables[(field, year)]
+
+
+if __name__ == "__main__":
+    build_savings_copy()
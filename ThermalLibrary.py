@@ -0,0 +1,270 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from DataStore import (
+    DATA_STORE,
+    build_file,
+    index_modified,
+    new_build,
+    publish_index,
+    read_index,
+    source_stamp,
+    source_unchanged,
+    write_json,
+)
+from DevelopThermalDynamicsModel import thermal_regression_data
+
+THERMAL_DIRECTORY = "Data/Processed_thermal_dynamics"
+COEFFICIENT_TABLE = os.path.join(DATA_STORE, "thermal_coefficients.json")
+THERMAL_STORE = os.path.join(DATA_STORE, "Processed_thermal_dynamics")
+
+# Tables built with another version are ignored, so bump it whenever the
+# thermal model or the layout of the table changes
+TABLE_VERSION = 2
+LAGS = 2
+
+_tables = {}
+_stores = {}
+
+
+def read_processed_file(path):
+    """Reads a processed thermal dynamics file as Building.read_thermal_dynamics_file"""
+    df = pd.read_csv(path)
+    df.drop("Unnamed: 0", inplace=True, axis=1)
+    return df
+
+
+def batched_least_squares(X, Y):
+    """Least squares fits of a stack of regressions of the same size
+
+    :param X: (fits × rows × coefficients) design matrices
+    :param Y: (fits × rows) regressands
+    :return: (params, covariance) of shapes (fits × coefficients) and
+        (fits × coefficients × coefficients), as statsmodels OLS
+    """
+    Q, R = np.linalg.qr(X)
+    params = np.linalg.solve(R, Q.transpose(0, 2, 1) @ Y[..., np.newaxis])[..., 0]
+    residuals = Y - (X @ params[..., np.newaxis])[..., 0]
+    scale = (residuals**2).sum(axis=-1) / (X.shape[1] - X.shape[2])
+    R_inv = np.linalg.inv(R)
+    covariance = scale[:, np.newaxis, np.newaxis] * (R_inv @ R_inv.transpose(0, 2, 1))
+    return params, covariance
+
+
+def build_coefficient_table(directory=THERMAL_DIRECTORY, path=COEFFICIENT_TABLE):
+    """Fits every archetype of the directory and writes the coefficient table
+
+    The archetypes with the same number of rows are fitted together in one
+    batched least squares. The table records the version, the number of
+    lags, the coefficient names and, for each archetype, the SHA-256 of its
+    source file, the coefficients and their covariance.
+
+    :return: The table as a dict
+    """
+    names = None
+    groups = {}
+    for source in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+        x, y = thermal_regression_data(read_processed_file(source), LAGS)
+        if names is None:
+            names = ["const"] + list(x.columns)
+        elif names != ["const"] + list(x.columns):
+            raise ValueError("Unexpected columns in {}".format(source))
+        X = np.column_stack([np.ones(len(x)), x.to_numpy(dtype=float)])
+        groups.setdefault(len(y), []).append((source, X, y.to_numpy(dtype=float)))
+
+    archetypes = {}
+    for rows, members in groups.items():
+        params, covariance = batched_least_squares(
+            np.stack([X for _, X, _ in members]),
+            np.stack([Y for _, _, Y in members]),
+        )
+        for i, (source, _, _) in enumerate(members):
+            archetypes[os.path.splitext(os.path.basename(source))[0]] = dict(
+                source_stamp(source),
+                rows=rows,
+                params=params[i].tolist(),
+                covariance=covariance[i].tolist(),
+            )
+
+    table = {
+        "version": TABLE_VERSION,
+        "lags": LAGS,
+        "coefficients": names,
+        "archetypes": archetypes,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_json(path, table)
+    _tables.pop(path, None)
+    print(
+        "Coefficient table of {} archetypes written to {}".format(len(archetypes), path)
+    )
+    return table
+
+
+def load_coefficient_table(path=COEFFICIENT_TABLE):
+    """Reads the coefficient table once per process, again when it is rebuilt
+
+    :return: The table as a dict, or None if there is no table of this version
+    """
+    if not os.path.exists(path):
+        return None
+    modified = os.stat(path).st_mtime_ns
+    if path not in _tables or _tables[path][0] != modified:
+        with open(path) as file:
+            table = json.load(file)
+        if table["version"] != TABLE_VERSION:
+            table = None
+        _tables[path] = (modified, table)
+    return _tables[path][1]
+
+
+def lookup_coefficients(archetype, path=COEFFICIENT_TABLE, directory=THERMAL_DIRECTORY):
+    """Coefficients of an archetype from the table
+
+    :param archetype: Name returned by Building.archetype
+    :return: (params, covariance) as returned by create_thermal_model, or
+        (None, None) if the archetype is not in the table or its processed
+        file has changed since the table was built
+    """
+    table = load_coefficient_table(path)
+    if table is None or archetype not in table["archetypes"]:
+        return None, None
+    entry = table["archetypes"][archetype]
+    if not source_unchanged(os.path.join(directory, archetype + ".csv"), entry):
+        print("{} changed since the coefficient table was built".format(archetype))
+        return None, None
+    names = table["coefficients"]
+    return (
+        pd.Series(entry["params"], index=names),
+        pd.DataFrame(entry["covariance"], index=names, columns=names),
+    )
+
+
+def stale_archetypes(directory=THERMAL_DIRECTORY, path=COEFFICIENT_TABLE):
+    """Archetypes of the directory that are missing or out of date in the table"""
+    table = load_coefficient_table(path)
+    archetypes = {} if table is None else table["archetypes"]
+    stale = []
+    for source in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+        name = os.path.splitext(os.path.basename(source))[0]
+        if name not in archetypes or not source_unchanged(source, archetypes[name]):
+            stale.append(name)
+    return stale
+
+
+def build_thermal_store(directory=THERMAL_DIRECTORY, store=THERMAL_STORE):
+    """Packs the processed thermal dynamics files into a columnar store
+
+    Every column of the files is written as one .npy array holding the
+    rows of all the archetypes one after the other. index.json records the
+    build, the columns, their dtypes and, for each archetype, its row range
+    and the source_stamp of its source file. The files of a new build are
+    published by publish_index, so that running processes are not affected.
+
+    :return: The index as a dict
+    """
+    build = new_build(store)
+    columns, archetypes, stop = None, {}, 0
+    frames = []
+    for source in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+        df = read_processed_file(source)
+        if columns is None:
+            columns = list(df.columns)
+        elif columns != list(df.columns):
+            raise ValueError("Unexpected columns in {}".format(source))
+        archetypes[os.path.splitext(os.path.basename(source))[0]] = dict(
+            source_stamp(source), start=stop, stop=stop + len(df)
+        )
+        stop += len(df)
+        frames.append(df)
+
+    data = pd.concat(frames, ignore_index=True)
+    dtypes = {}
+    for number, column in enumerate(columns):
+        values = data[column].to_numpy()
+        if values.dtype == object:
+            # Object arrays cannot be memory-mapped
+            values = values.astype(str)
+        np.save(build_file(store, build, "{}.npy".format(number)), values)
+        dtypes[column] = values.dtype.str
+    index = {
+        "version": TABLE_VERSION,
+        "build": build,
+        "columns": columns,
+        "dtypes": dtypes,
+        "archetypes": archetypes,
+    }
+    publish_index(store, index)
+    print("Thermal store of {} archetypes written to {}".format(len(archetypes), store))
+    return index
+
+
+def open_thermal_store(store=THERMAL_STORE):
+    """Memory-maps the columns of the store, again whenever it is rebuilt
+
+    :return: (index, arrays) where arrays maps each column to its memory
+        mapped array, or None if there is no store of this version
+    """
+    modified = index_modified(store)
+    if modified is None:
+        return None
+    if store not in _stores or _stores[store][0] != modified:
+        read = read_index(store)
+        if read is None:
+            return None
+        modified, index = read
+        opened = None
+        if index["version"] == TABLE_VERSION:
+            try:
+                arrays = {
+                    column: np.load(
+                        build_file(store, index["build"], "{}.npy".format(number)),
+                        mmap_mode="r",
+                    )
+                    for number, column in enumerate(index["columns"])
+                }
+            except FileNotFoundError:
+                # Replaced by a newer build meanwhile, opened on the next call
+                return None
+            opened = (index, arrays)
+        _stores[store] = (modified, opened)
+    return _stores[store][1]
+
+
+def load_thermal_dynamics(
+    archetype, columns=None, store=THERMAL_STORE, directory=THERMAL_DIRECTORY
+):
+    """Columns of an archetype from the thermal store
+
+    The columns are read-only slices of the memory-mapped arrays, so only
+    the pages of the requested columns and rows are read and processes
+    share them.
+
+    :param archetype: Name returned by Building.archetype
+    :param columns: Columns to load, by default all of them
+    :return: dict of arrays, or None if the archetype or one of the columns
+        is not in the store or its processed file has changed since the
+        store was built
+    """
+    opened = open_thermal_store(store)
+    if opened is None or archetype not in opened[0]["archetypes"]:
+        return None
+    index, arrays = opened
+    rows = index["archetypes"][archetype]
+    if columns is None:
+        columns = index["columns"]
+    elif not set(columns) <= set(index["columns"]):
+        return None
+    if not source_unchanged(os.path.join(directory, archetype + ".csv"), rows):
+        print("{} changed since the thermal store was built".format(archetype))
+        return None
+    return {column: arrays[column][rows["start"] : rows["stop"]] for column in columns}
+
+
+if __name__ == "__main__":
+    build_coefficient_table()
+    build_thermal_store()
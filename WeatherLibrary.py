@@ -0,0 +1,173 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from DataStore import (
+    DATA_STORE,
+    build_file,
+    index_modified,
+    new_build,
+    publish_index,
+    read_index,
+    source_stamp,
+    source_unchanged,
+)
+
+CLIMATE_ZONES = {"Melbourne": 62, "Brisbane": 10, "Adelaide": 16, "Sydney": 56}
+TMY_DIRECTORY = "Data/TMY"
+WEATHER_CACHE = os.path.join(DATA_STORE, "TMY")
+
+# Field widths of the climate files, the fields used are listed in FIELDS
+TMY_WIDTHS = [
+    2,
+    2,
+    2,
+    2,
+    2,
+    4,
+    3,
+    4,
+    3,
+    2,
+    1,
+    1,
+    1,
+    1,
+    1,
+    1,
+    1,
+    4,
+    3,
+    4,
+    2,
+    3,
+    1,
+    1,
+    5,
+    5,
+    20,
+]
+FIELDS = {
+    "year": 1,
+    "month": 2,
+    "day": 3,
+    "hour": 4,
+    "DBT": 5,
+    "Wspd": 8,
+    "GHI": 17,
+    "DHI": 18,
+    "DNI": 19,
+    "Altitude": 20,
+    "Azimuth": 21,
+}
+
+# Bump it whenever the parsing below changes, to ignore the cached arrays
+CACHE_VERSION = 2
+
+_weather = {}
+
+
+def climate_file(city):
+    return os.path.join(TMY_DIRECTORY, "climat{}.txt".format(CLIMATE_ZONES[city]))
+
+
+def parse_climate_file(path):
+    """Parses a TMY climate file into typed arrays
+
+    :return: dict of the arrays of FIELDS, with DBT [°C] and Wspd [m/s] in
+        their units and four-digit years, and of the DateTime of each hour
+    """
+    weather = pd.read_fwf(path, widths=TMY_WIDTHS, header=None)
+    arrays = {name: weather[field].to_numpy() for name, field in FIELDS.items()}
+    arrays["DBT"] = arrays["DBT"] / 10
+    arrays["Wspd"] = arrays["Wspd"] / 10
+    arrays["year"] = np.where(
+        arrays["year"] > 30, arrays["year"] + 1900, arrays["year"] + 2000
+    )
+    arrays["DateTime"] = pd.to_datetime(
+        pd.DataFrame({name: arrays[name] for name in ["year", "month", "day", "hour"]})
+    ).to_numpy()
+    return arrays
+
+
+def build_weather_cache(cities=CLIMATE_ZONES, cache=WEATHER_CACHE):
+    """Parses the climate files of the cities into the cache, run offline
+
+    The arrays of each city are written as one .npz, and index.json records
+    the build and the source_stamp of each climate file, see publish_index.
+
+    :return: The index as a dict
+    """
+    build = new_build(cache)
+    sources = {}
+    for city in cities:
+        path = climate_file(city)
+        np.savez(build_file(cache, build, city + ".npz"), **parse_climate_file(path))
+        sources[city] = source_stamp(path)
+    index = {"version": CACHE_VERSION, "build": build, "cities": sources}
+    publish_index(cache, index)
+    print("Weather of {} cities cached in {}".format(len(sources), cache))
+    return index
+
+
+def read_cached_climate(city, cache=WEATHER_CACHE):
+    """Arrays of a city from the cache built by build_weather_cache
+
+    :return: dict of arrays, see parse_climate_file, or None if the city is
+        not in a cache of this version or its climate file has changed
+    """
+    read = read_index(cache)
+    if read is None or read[1]["version"] != CACHE_VERSION:
+        return None
+    index = read[1]
+    if city not in index["cities"]:
+        return None
+    if not source_unchanged(climate_file(city), index["cities"][city]):
+        print("Climate file of {} changed since it was cached".format(city))
+        return None
+    try:
+        with np.load(build_file(cache, index["build"], city + ".npz")) as data:
+            return {name: data[name] for name in data.files}
+    except FileNotFoundError:
+        # Replaced by a newer build meanwhile
+        return None
+
+
+def read_climate(city, cache=WEATHER_CACHE):
+    """Arrays of the climate file of a city, read once per process
+
+    The arrays come from the cache when it matches the climate file, and
+    are parsed from the file otherwise. Nothing is written here, the cache
+    is built offline by build_weather_cache.
+
+    :return: dict of read-only arrays, see parse_climate_file
+    """
+    path = climate_file(city)
+    status = os.stat(path)
+    stamp = (status.st_size, status.st_mtime_ns, index_modified(cache))
+    if path not in _weather or _weather[path][0] != stamp:
+        arrays = read_cached_climate(city, cache)
+        if arrays is None:
+            arrays = parse_climate_file(path)
+        for values in arrays.values():
+            values.setflags(write=False)
+        _weather[path] = (stamp, arrays)
+    return _weather[path][1]
+
+
+def weather_frame(city):
+    """Hourly weather of a city indexed by DateTime
+
+    :return: DataFrame of the columns of FIELDS
+    """
+    arrays = read_climate(city)
+    return pd.DataFrame(
+        {name: arrays[name] for name in FIELDS},
+        index=pd.DatetimeIndex(arrays["DateTime"], name="DateTime"),
+        copy=True,
+    )
+
+
+if __name__ == "__main__":
+    build_weather_cache()
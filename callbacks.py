@@ -9,8 +9,12 @@ from app_components import (
     create_selected_profile_fig,
     simulation_tab_content,
 )
+from DemandLibrary import cluster_profiles, site_profile
 from summaryTab import summaryTabContent
 
+# Number of sites of clusters 1 and 2 shown in the demand selection
+SELECTION_SITES = 40
+
 
 @app.callback(Output("Visible-content", "children"), Input("tabs", "active_tab"))
 def switch_tab(tab):
@@ -146,18 +150,14 @@ def update_graphs(
     answer_cluster_question,
 ):
     cluster_dic = {
-        "no-surplus": [4],
-        "surpluss-available": [2],
-        "modest-surplus": [1],
+        "no-surplus": 4,
+        "surpluss-available": 2,
+        "modest-surplus": 1,
     }
     cluster = cluster_dic[answer_cluster_question]
     if is_open == True:
-        df = pd.read_csv("Data/average_demand_and_clusters_for_demand_selection.csv")
-        df = df[df["Cluster"].isin(cluster)]
-        if (cluster == [1]) | (cluster == [2]):
-            unique_ids = df["site_ID"].unique()
-            unique_ids = unique_ids[:40]
-            df = df[df["site_ID"].isin(unique_ids)]
+        # Only the first sites of the large clusters are shown
+        df = cluster_profiles(cluster, SELECTION_SITES if cluster in (1, 2) else None)
         fig = create_select_demand_profile_fig(
             df,
             title="Click on the most similar net demand profile to your average hourly net demand profile",
@@ -194,8 +194,7 @@ def display_selected_data(
         # if clickData["points"][0]["customdata"][0] is not None:
 
         site_id = clickData["points"][0]["customdata"][0]
-        df = pd.read_csv("Data/average_demand_and_clusters_for_demand_selection.csv")
-        df = df[df["site_ID"] == site_id]
+        df = site_profile(site_id)
         fig = create_selected_profile_fig(df)
 
         if is_open == True:
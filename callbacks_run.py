@@ -2,18 +2,25 @@ import dash
 import pandas as pd
 from dash import CeleryManager, DiskcacheManager, Input, Output, State, dcc, html
 from dash.exceptions import PreventUpdate
+import copy
+import hashlib
 import pickle
 from app import app
 from DevelopThermalDynamicsModel import (
     Building,
     join_PV_load_temp,
-    run_scenarios,
+    stream_scenarios,
+    reprice_scenarios,
+    read_emission_intensity,
     add_emission_column,
 )
 from PVPerformance import calculate_PV_output
+from ResultCache import ResultCache
 from functions import (
     read_demand_from_xlsx_file,
     process_tariff_rates,
+    read_tariffs,
+    run_stages,
 )
 from figures import line_plot
 from dynamicFigures import generate_single_building_graphs
@@ -26,6 +33,60 @@ figure_border_style = {
     "border-radius": "0.25rem",
 }
 
+# Number of simulated days between progress updates of the run callback
+PROGRESS_DAYS = 15
+
+# Simulated buildings keyed by simulation_key, reused when only the tariff
+# changes. diskcache commits each entry atomically, so the background
+# callback processes can share it.
+SESSION_DIRECTORY = "session_cache"
+SESSION_SIZE_LIMIT = 2**28
+
+_sessions = None
+_results = None
+
+
+def session_cache():
+    global _sessions
+    if _sessions is None:
+        import diskcache
+
+        _sessions = diskcache.Cache(
+            SESSION_DIRECTORY,
+            size_limit=SESSION_SIZE_LIMIT,
+            eviction_policy="least-recently-used",
+        )
+    return _sessions
+
+
+def result_cache():
+    """Results of run_scenarios shared with the batch runs, see ResultCache"""
+    global _results
+    if _results is None:
+        _results = ResultCache()
+    return _results
+
+
+def simulation_key(*states):
+    """Hash of the simulation inputs, including the saved PV generation"""
+    digest = hashlib.sha256(pickle.dumps(states))
+    with open("PV_generation.csv", "rb") as file:
+        digest.update(file.read())
+    return digest.hexdigest()
+
+
+def load_session(key):
+    """Returns the building simulated for key, or None"""
+    return session_cache().get(key)
+
+
+def save_session(key, building):
+    # The daily results are slices of final_df and are rebuilt on reuse
+    building = copy.copy(building)
+    building.daily_results_dic = {}
+    session_cache().set(key, building)
+
+
 # Create thermal model
 @app.callback(
     output=(
@@ -72,9 +133,15 @@ def update_thermal_model(
             city=location,
         )
         print("Callback thermal model after click: OK")
+        if building.thermal_dynamics_df is None:
+            # The coefficients came from the table, the run still needs the data
+            building.read_thermal_dynamics_file()
         coeffs_df = building.thermal_coefficients.to_frame()
         # coeffs_df.to_csv("coefficients.csv")
-        coeffs_json = coeffs_df.to_json(date_format="iso", orient="split")
+        # Full precision, as the run reuses these coefficients
+        coeffs_json = coeffs_df.to_json(
+            date_format="iso", orient="split", double_precision=15
+        )
         thermal_dynamics_json = (
             building.thermal_dynamics_df.to_json(date_format="iso", orient="split"),
         )
@@ -233,36 +300,98 @@ def update_progress(
             )
             return ([output_text], [], hidden_div_run)  # None,
 
-        df_TMY = pd.read_json(hidden_div_thermal[0], orient="split")
-        print("Thermal model ok")
-
-        df_coeffs = pd.read_json(thermal_coefficients, orient="split")
-        print("Coefficient reading OK")
-        df_PV = pd.read_csv("PV_generation.csv")
-        print("read PV simulation results OK")
-
-        df_demand = read_demand_from_xlsx_file(site_id)
-        print("Read demand file Ok")
-
-        ready_df = join_PV_load_temp(PV=df_PV, load_temp=df_TMY, real_demand=df_demand)
-        # This df is used for baseline and pre-cooling scenarios
-        print("ready df ok")
-
-        building = Building(
-            starRating=starRating,
-            weight=weight,
-            type=building_type,
-            size=building_size,
-            AC_size=AC_size,
-            city=location,
-        )
-        building.occupancy_checklist = weekdays_occ
-        building.update_temperature_preferences(
-            ready_df, neutral_temp, upper_limit, lower_limit
+        # Everything but the tariff, which only changes the costs
+        key = simulation_key(
+            thermal_coefficients,
+            hidden_div_thermal,
+            neutral_temp,
+            upper_limit,
+            lower_limit,
+            weekdays_occ,
+            AC_size,
+            site_id,
+            starRating,
+            weight,
+            building_type,
+            building_size,
+            location,
         )
-        # Add emission column
-        building = process_tariff_rates(building, tariff_id)
-        building = run_scenarios(building)
+        building = load_session(key)
+        if building is not None:
+            print("Same simulation inputs, recomputing the costs only")
+            building = reprice_scenarios(building, tariff_id)
+        else:
+            # Independent inputs are read in parallel, see functions.run_stages
+            stages, timings = run_stages(
+                {
+                    "thermal": (
+                        lambda: pd.read_json(hidden_div_thermal[0], orient="split"),
+                        [],
+                    ),
+                    "coefficients": (
+                        lambda: pd.read_json(thermal_coefficients, orient="split"),
+                        [],
+                    ),
+                    "PV": (lambda: pd.read_csv("PV_generation.csv"), []),
+                    "demand": (lambda: read_demand_from_xlsx_file(site_id), []),
+                    # The model of the thermal model step is reused, not refitted
+                    "building": (
+                        lambda df_TMY, df_coeffs: Building(
+                            starRating=starRating,
+                            weight=weight,
+                            type=building_type,
+                            size=building_size,
+                            AC_size=AC_size,
+                            city=location,
+                            thermal_coefficients=df_coeffs.iloc[:, 0],
+                            thermal_dynamics_df=df_TMY,
+                        ),
+                        ["thermal", "coefficients"],
+                    ),
+                    "tariffs": (read_tariffs, []),
+                    "emission": (lambda: read_emission_intensity(location), []),
+                    # This df is used for baseline and pre-cooling scenarios
+                    "ready_df": (
+                        lambda df_TMY, df_PV, df_demand: join_PV_load_temp(
+                            PV=df_PV, load_temp=df_TMY, real_demand=df_demand
+                        ),
+                        ["thermal", "PV", "demand"],
+                    ),
+                }
+            )
+            print(
+                "Input stages [s]: "
+                + ", ".join("{} {:.2f}".format(*item) for item in timings.items())
+            )
+
+            building = stages["building"]
+            building.occupancy_checklist = weekdays_occ
+            building.update_temperature_preferences(
+                stages["ready_df"], neutral_temp, upper_limit, lower_limit
+            )
+            # Add emission column
+            building = process_tariff_rates(building, tariff_id, stages["tariffs"])
+            # Same key as run_scenarios, whose results stream_scenarios matches
+            cache_key = result_cache().key(
+                building, optimal=False, mpc=False, full_year=False
+            )
+            if result_cache().load(cache_key, building):
+                print("scenarios are loaded from the result cache!")
+            else:
+                for date, day_df, totals in stream_scenarios(
+                    building, days=PROGRESS_DAYS, emission_df=stages["emission"]
+                ):
+                    if totals["days"] % PROGRESS_DAYS == 0:
+                        set_progress(
+                            [
+                                "Solar pre-cooling simulation in progress: {} days, "
+                                "${:.2f} saved so far".format(
+                                    totals["days"], totals["total_cost_Savings"]
+                                )
+                            ]
+                        )
+                result_cache().save(cache_key, building)
+        save_session(key, building)
         hidden_div_run = [n_clicks]
         return (
             ["Successful!"],
@@ -5,6 +5,7 @@ import plotly.graph_objects as go
 import plotly.figure_factory as ff
 import plotly.express as px
 import dash_bootstrap_components as dbc
+from SummaryLibrary import read_savings_overview, savings_table
 
 font_color = "white"
 simple_template = dict(
@@ -44,7 +45,7 @@ def line_plot(
 
 
 def create_pie_distribution(year=2022):
-    df = pd.read_excel("Data/Overview of the savings.xlsx")
+    df = read_savings_overview()
 
     fig = px.sunburst(
         df,
@@ -62,43 +63,7 @@ def create_pie_distribution(year=2022):
 
 
 def table_of_savings(field, year=2022):
-    df = pd.read_excel("Data/Overview of the savings.xlsx")
-    if field == "saving":
-        df.sort_values(by="Maximum savings", inplace=True, ascending=False)
-        df["% of households"] = df["Percentage of buildings {}".format(year)].cumsum()
-        df["% of households"] = df["% of households"].round(1)
-        df.rename(
-            columns={"Maximum savings": "Potential cost savings ($/Summer)"},
-            inplace=True,
-        )
-        df = df[["% of households", "Potential cost savings ($/Summer)"]]
-        # df = df.iloc[:-1]
-
-    elif field == "discomfort":
-        df = pd.read_excel("Data/Overview of the savings.xlsx")
-        df.sort_values(by="Discomfort reduction", inplace=True, ascending=False)
-        df["% of households"] = df["Percentage of buildings {}".format(year)].cumsum()
-        df["% of households"] = df["% of households"].round(1)
-        df.rename(
-            columns={
-                "Discomfort reduction": "Daily discomfort reduction (degree.hour)"
-            },
-            inplace=True,
-        )
-        df = df[["% of households", "Daily discomfort reduction (degree.hour)"]]
-        # df = df.iloc[:-1]
-
-    elif field == "emission":
-        df = pd.read_excel("Data/Overview of the savings.xlsx")
-        df.sort_values(by="Emission Reduction", inplace=True, ascending=False)
-        df["% of households"] = df["Percentage of buildings {}".format(year)].cumsum()
-        df["% of households"] = df["% of households"].round(1)
-        df.rename(
-            columns={"Emission Reduction": "Emission Reduction (kg/summer)"},
-            inplace=True,
-        )
-        df = df[["% of households", "Emission Reduction (kg/summer)"]]
-        # df = df.iloc[:-1]
+    df = savings_table(field, year)
     # fig = ff.create_table(df)
     fig = html.Div(
         [
@@ -7,6 +7,13 @@ def read_demand_from_upload():
 
 
 def read_demand_from_xlsx_file(site_id):
+    from DemandLibrary import read_site_demand
+
+    # One contiguous row of the store built by DemandLibrary.build_demand_store
+    df_demand = read_site_demand(site_id)
+    if df_demand is not None:
+        return df_demand
+
     df_demand = pd.read_excel(
         "Data/three_month_demand.xlsx"
     )  # convert it to online query
@@ -51,11 +58,28 @@ def parse_data(contents, filename):
     return df
 
 
-def process_tariff_rates(building, tariff_id):
+def process_tariff_rates(building, tariff_id, tariff_dicts=None):
+    apply_tariff(building.ready_df, tariff_id, tariff_dicts)
+    building.ready_df.to_csv("tariff_added.csv")
+
+    return building
+
+
+def read_tariffs():
+    """Reads the list of tariff dicts in RetailTariffs.json"""
     json = pd.read_json("RetailTariffs.json")
-    tariff_dicts = json.Tariffs[0]
+    return json.Tariffs[0]
+
+
+def apply_tariff(df, tariff_id, tariff_dicts=None):
+    """Sets the hourly Tariff and FiT columns of df in place for the tariff
+
+    :param tariff_dicts: Tariffs returned by read_tariffs, read if not given
+    """
+    if tariff_dicts is None:
+        tariff_dicts = read_tariffs()
     print(tariff_id)
-    building.ready_df["Tariff"] = 0
+    df["Tariff"] = 0
 
     for t in tariff_dicts:
         if t["Tariff ID"] == tariff_id:
@@ -63,7 +87,7 @@ def process_tariff_rates(building, tariff_id):
 
     if tariff["Type"] == "TOU":
         off_peak_rate = tariff["Parameters"]["TOU"]["Off Peak Weekdays"]["Value"]
-        building.ready_df["Tariff"] = off_peak_rate
+        df["Tariff"] = off_peak_rate
 
         if "Peak Weekdays" in tariff.keys():
             peak_intervals = tariff["Parameters"]["TOU"]["Peak Weekdays"][
@@ -73,9 +97,8 @@ def process_tariff_rates(building, tariff_id):
             for key in peak_intervals.keys():
                 start = pd.to_datetime(peak_intervals[key][0]).hour
                 end = pd.to_datetime(peak_intervals[key][1]).hour
-                building.ready_df.loc[
-                    (building.ready_df["hour"] < end)
-                    & (building.ready_df["hour"] >= start),
+                df.loc[
+                    (df["hour"] < end) & (df["hour"] >= start),
                     "Tariff",
                 ] = peak_rate
                 print(start, end)
@@ -88,21 +111,57 @@ def process_tariff_rates(building, tariff_id):
             for key in shoulder_intervals.keys():
                 start = pd.to_datetime(shoulder_intervals[key][0]).hour
                 end = pd.to_datetime(shoulder_intervals[key][1]).hour
-                building.ready_df.loc[
-                    (building.ready_df["hour"] < end)
-                    & (building.ready_df["hour"] >= start),
+                df.loc[
+                    (df["hour"] < end) & (df["hour"] >= start),
                     "Tariff",
                 ] = shoulder_rate
                 print(start, end)
 
     elif tariff["Type"] == "Single_Rate":
         flat_rate = tariff_dicts[0]["Parameters"]["FlatRate"]["Value"]
-        building.ready_df["Tariff"] = flat_rate
+        df["Tariff"] = flat_rate
 
-    building.ready_df["FiT"] = tariff["Parameters"]["FiT"]["Value"]
-    building.ready_df.to_csv("tariff_added.csv")
+    df["FiT"] = tariff["Parameters"]["FiT"]["Value"]
+    return df
 
-    return building
+
+def run_stages(stages, workers=None):
+    """Runs a graph of stages in a thread pool as soon as their inputs are ready
+
+    :param stages: dict of name: (function, names of the stages whose
+        results are passed to the function, in order)
+    :param workers: Number of threads, by default chosen by ThreadPoolExecutor
+    :return: (results, timings) dicts keyed by stage name, with the wall
+        time of each stage in seconds
+    """
+    import time
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    results, timings, running = {}, {}, {}
+    pending = dict(stages)
+
+    def timed(name, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        timings[name] = time.perf_counter() - start
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for name, (function, inputs) in list(pending.items()):
+                if all(stage in results for stage in inputs):
+                    arguments = [results[stage] for stage in inputs]
+                    future = executor.submit(timed, name, function, *arguments)
+                    running[future] = name
+                    del pending[name]
+            if not running:
+                raise ValueError(
+                    "Stages with missing inputs: {}".format(", ".join(pending))
+                )
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results, timings
 
 
 if __name__ == "__main__":
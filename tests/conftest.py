@@ -0,0 +1,118 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY)
+
+from DevelopThermalDynamicsModel import Building  # noqa: E402
+
+# Coefficients of the same order of magnitude as the fitted archetypes
+COEFFICIENTS = pd.Series(
+    {
+        "const": 0.3,
+        "outdoor": 0.05,
+        "agg_AC": 0.09,
+        "SR": 0.0004,
+        "agg_temp1": 1.25,
+        "agg_temp2": -0.32,
+        "outdoor1": 0.02,
+        "outdoor2": -0.01,
+        "agg_AC1": -0.03,
+        "agg_AC2": 0.005,
+        "SR1": 0.0002,
+        "SR2": -0.0001,
+    }
+)
+
+
+def synthetic_ready_df(seed=0):
+    """A year of ready_df rows with a 23-hour daylight saving day in October"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2020-01-01", "2020-12-31 23:00", freq="H")
+    df = pd.DataFrame({"month": times.month, "day": times.day, "hour": times.hour})
+    df["date"] = times.date
+    hour = df["hour"].to_numpy()
+    df["outdoor"] = np.round(
+        27 + 9 * np.sin((hour - 9) / 24 * 2 * np.pi) + 3 * rng.standard_normal(len(df)),
+        1,
+    )
+    df["SR"] = np.clip(900 * np.sin((hour - 6) / 12 * np.pi), 0, None).round()
+    df["PV"] = np.clip(5 * np.sin((hour - 6) / 12 * np.pi), 0, None) * rng.uniform(
+        0.5, 1, len(df)
+    )
+    df["Demand"] = rng.uniform(0.2, 2, len(df))
+    df["Surplus_PV"] = (df["PV"] - df["Demand"]).clip(lower=0)
+    df["Tariff"] = np.where((df["hour"] >= 15) & (df["hour"] < 21), 0.45, 0.2)
+    df["FiT"] = 0.05
+    df = df[~((df["month"] == 10) & (df["day"] == 4) & (df["hour"] == 2))]
+    return df.reset_index(drop=True)
+
+
+def synthetic_emission_df(ready_df):
+    emission_df = ready_df[["month", "day", "hour"]].copy()
+    emission_df["Emission_intensity"] = 0.8
+    return emission_df
+
+
+@pytest.fixture
+def building(tmp_path, monkeypatch):
+    """A building with known coefficients, run from an empty directory"""
+    monkeypatch.chdir(tmp_path)
+    building = Building(
+        starRating="2star",
+        weight="Heavy",
+        type="Apartment",
+        size="Large",
+        AC_size=7.0,
+        thermal_coefficients=COEFFICIENTS.copy(),
+        thermal_dynamics_df=pd.DataFrame(),
+    )
+    building.update_temperature_preferences(synthetic_ready_df(), 25, 27, 21)
+    building.ready_df["Occupancy"] = 0
+    return building
+
+
+@pytest.fixture
+def data_files(building):
+    """Tariffs and an emission intensity file in the directory of building"""
+    shutil.copy(os.path.join(REPOSITORY, "RetailTariffs.json"), ".")
+    os.makedirs("Data")
+    emission_df = pd.DataFrame(
+        {
+            "Region": "SA",
+            "Date": pd.unique(building.ready_df["date"]).astype(str).repeat(24),
+            "Hour": np.tile(np.arange(24), building.ready_df["date"].nunique()),
+            "Zero": 0.8,
+        }
+    )
+    emission_df.to_csv("Data/hourly_emission_for_SPCaH_average_emissions.csv")
+
+
+def write_processed_file(path, seed=0):
+    """Writes a processed thermal dynamics file of random hourly data"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2020-01-01", periods=24 * 60, freq="H")
+    df = pd.DataFrame({"month": times.month, "day": times.day, "hour": times.hour})
+    df["agg_temp"] = 24 + rng.normal(0, 2, len(df)).cumsum() / 10
+    df["outdoor"] = 25 + rng.normal(0, 4, len(df))
+    df["agg_AC"] = np.minimum(rng.normal(0, 3, len(df)), 0)
+    df["SR"] = rng.uniform(0, 900, len(df)).round()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_csv(path)
+
+
+@pytest.fixture
+def processed_files(tmp_path, monkeypatch):
+    """Two archetypes in Data/Processed_thermal_dynamics of an empty directory"""
+    monkeypatch.chdir(tmp_path)
+    names = ["Large_Apartment_2star_Heavy_Adelaide", "Small_House_6star_Light_Sydney"]
+    for seed, name in enumerate(names):
+        write_processed_file(
+            "Data/Processed_thermal_dynamics/{}.csv".format(name), seed
+        )
+    return names
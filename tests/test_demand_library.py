@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import DemandLibrary
+from functions import read_demand_from_xlsx_file
+
+
+def write_demand_workbook(path, seed=0):
+    """Writes a demand workbook of two sites"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2020-01-01", periods=24 * 3, freq="H")
+    df = pd.DataFrame({"day": times.day, "month": times.month, "hour": times.hour})
+    for site in ["S0001", "S0002"]:
+        df[site] = rng.uniform(0, 2, len(df))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_excel(path, index=False)
+    return df
+
+
+def test_demand_store_matches_the_workbook_until_it_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(DemandLibrary, "_stores", {})
+    workbook = DemandLibrary.DEMAND_WORKBOOK
+    write_demand_workbook(workbook)
+    DemandLibrary.build_demand_store()
+
+    stored = DemandLibrary.read_site_demand("S0002")
+    expected = pd.read_excel(workbook)[["day", "month", "hour", "S0002"]]
+    expected = expected.rename(columns={"S0002": "Demand"})
+    pd.testing.assert_frame_equal(stored, expected)
+    assert DemandLibrary.read_site_demand("S0003") is None
+
+    # Touched but not changed
+    os.utime(workbook, ns=(0, 0))
+    assert DemandLibrary.read_site_demand("S0002") is not None
+
+    changed = write_demand_workbook(workbook, seed=1)
+    assert DemandLibrary.read_site_demand("S0002") is None
+    assert np.allclose(read_demand_from_xlsx_file("S0002")["Demand"], changed["S0002"])
+
+    DemandLibrary.build_demand_store()
+    assert np.allclose(
+        DemandLibrary.read_site_demand("S0002")["Demand"], changed["S0002"]
+    )
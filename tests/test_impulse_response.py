@@ -0,0 +1,15 @@
+import numpy as np
+
+from DevelopThermalDynamicsModel import to_day_matrix
+from ImpulseResponse import ThermalResponse
+
+
+def test_response_matches_the_baseline_kernel(building):
+    building.simulate_summer()
+    response, summer, day, position = ThermalResponse.from_building(building)
+    assert np.array_equal(summer["date"], building.final_df["date"])
+
+    Q = to_day_matrix(building.final_df["Q_bs"].to_numpy(), day, position)
+    T = response.temperature(np.nan_to_num(Q))[day, position]
+    assert (building.final_df["Q_bs"] < 0).any()
+    assert np.allclose(T, building.final_df["T_bs"], rtol=0, atol=1e-11)
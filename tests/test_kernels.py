@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import COEFFICIENTS, synthetic_emission_df
+
+from DevelopThermalDynamicsModel import (
+    occupancy_profile,
+    simulate_baseline_summer,
+    simulate_solar_precool,
+    stream_scenarios,
+    unpack_coefficients,
+)
+
+
+def reference_terms(c, outdoor, SR, T, Q, i):
+    """Hourly equation of the original loops, without agg_AC * Q[i]"""
+    return (
+        c["outdoor1"] * outdoor[i - 1],
+        c["agg_temp1"] * T[i - 1],
+        c["SR1"] * SR[i - 1],
+        c["agg_AC1"] * Q[i - 1],
+        c["outdoor"] * outdoor[i],
+        c["SR"] * SR[i],
+        c["outdoor2"] * outdoor[i - 2],
+        c["agg_temp2"] * T[i - 2],
+        c["agg_AC2"] * Q[i - 2],
+        c["SR2"] * SR[i - 2],
+        c["const"],
+    )
+
+
+def reference_temperature(c, terms, Q_i):
+    T = terms[0] + terms[1] + terms[2] + terms[3] + c["agg_AC"] * Q_i
+    for term in terms[4:]:
+        T = T + term
+    return T
+
+
+def reference_AC(c, terms, T_setpoint):
+    total = -T_setpoint
+    for term in terms:
+        total = total + term
+    return -total / c["agg_AC"]
+
+
+def reference_baseline(c, outdoor, SR, occupancy, neutral, upper, AC_size, setpoint):
+    """Hour by hour baseline_summer of the original Building"""
+    T, Q = [0.0] * len(outdoor), [0.0] * len(outdoor)
+    for i in range(len(outdoor)):
+        if i < 6:
+            T[i] = neutral - 1
+            continue
+        terms = reference_terms(c, outdoor, SR, T, Q, i)
+        T[i] = reference_temperature(c, terms, 0.0)
+        if T[i] > upper and occupancy[i] == 1:
+            Q[i] = max(min(reference_AC(c, terms, setpoint), 0), -AC_size)
+            T[i] = reference_temperature(c, terms, Q[i])
+    return T, Q
+
+
+def reference_precool(
+    c, outdoor, SR, surplus_PV, occupancy, neutral, upper, lower, AC_size, cop, setpoint
+):
+    """Hour by hour solar_precool of the original Building"""
+    T, Q = [0.0] * len(outdoor), [0.0] * len(outdoor)
+    for i in range(len(outdoor)):
+        if i < 6:
+            T[i] = neutral - 1
+            continue
+        terms = reference_terms(c, outdoor, SR, T, Q, i)
+        Q[i] = max(
+            min(reference_AC(c, terms, lower), 0), -surplus_PV[i] * cop, -AC_size
+        )
+        T[i] = reference_temperature(c, terms, Q[i])
+        if T[i] > upper and occupancy[i] == 1 and Q[i] > -AC_size:
+            Q[i] = max(reference_AC(c, terms, setpoint), -AC_size)
+            T[i] = reference_temperature(c, terms, Q[i])
+    return T, Q
+
+
+@pytest.mark.parametrize("hours", [24, 23])
+def test_summer_kernels_match_the_hourly_loop(hours):
+    rng = np.random.default_rng(hours)
+    days = 5
+    hour = np.arange(hours)
+    outdoor = np.round(30 + 8 * np.sin((hour - 9) / 24 * 2 * np.pi), 1)
+    outdoor = outdoor + rng.normal(0, 3, (days, hours)).round(1)
+    SR = np.clip(900 * np.sin((hour - 6) / 12 * np.pi), 0, None) + rng.integers(
+        0, 50, (days, hours)
+    )
+    surplus_PV = rng.uniform(0, 3, (days, hours))
+    occupancy = occupancy_profile([1, 3, 4], hours)
+    coefficients = unpack_coefficients(COEFFICIENTS)
+
+    T_bs, Q_bs = simulate_baseline_summer(
+        coefficients, outdoor, SR, occupancy, 25, 27, 7.0, 25
+    )
+    T_spc, Q_spc = simulate_solar_precool(
+        coefficients, outdoor, SR, surplus_PV, occupancy, 25, 27, 21, 7.0, 3.5, 25
+    )
+    for d in range(days):
+        T, Q = reference_baseline(
+            COEFFICIENTS, outdoor[d], SR[d], occupancy, 25, 27, 7.0, 25
+        )
+        assert np.array_equal(T_bs[d], T) and np.array_equal(Q_bs[d], Q)
+        T, Q = reference_precool(
+            COEFFICIENTS,
+            outdoor[d],
+            SR[d],
+            surplus_PV[d],
+            occupancy,
+            25,
+            27,
+            21,
+            7.0,
+            3.5,
+            25,
+        )
+        assert np.array_equal(T_spc[d], T) and np.array_equal(Q_spc[d], Q)
+    assert (Q_bs < 0).any() and (Q_spc < 0).any()
+
+
+@pytest.mark.parametrize("full_year", [False, True])
+def test_batched_per_day_stream_and_workers_agree(building, full_year):
+    if full_year:
+        building.simulate_year()
+    else:
+        building.simulate_summer()
+    batched = building.final_df
+
+    building.simulate_days(full_year)
+    pd.testing.assert_frame_equal(building.final_df, batched, check_exact=True)
+
+    if full_year:
+        building.simulate_year(workers=2)
+    else:
+        building.simulate_summer(workers=2)
+    pd.testing.assert_frame_equal(building.final_df, batched, check_exact=True)
+
+    days = list(
+        stream_scenarios(
+            building,
+            full_year=full_year,
+            days=7,
+            emission_df=synthetic_emission_df(building.ready_df),
+        )
+    )
+    assert len(days) == batched["date"].nunique()
+    streamed = pd.concat([day_df for _, day_df, _ in days])
+    pd.testing.assert_frame_equal(streamed, batched, check_exact=True)
+    assert np.isclose(days[-1][2]["total_cost_Savings"], building.total_cost_Savings)
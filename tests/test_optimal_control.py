@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+import functions
+from DevelopThermalDynamicsModel import run_scenarios, stack_days
+from OptimalControl import forecast_inputs, mpc_precool, previous_days
+
+
+def test_persistence_uses_the_previous_calendar_day():
+    # Summer rows are ordered Jan, Feb, Sep, ..., Dec
+    dates = pd.Series(["2020-01-01", "2020-01-02", "2020-02-29", "2020-09-01"])
+    dates = dates.repeat(24).to_numpy()
+    day, position = stack_days(dates)
+    assert list(previous_days(dates, day)) == [-1, 0, -1, -1]
+
+    values = np.arange(4.0)[:, np.newaxis] + np.zeros(24)
+    truth = {column: values for column in ["outdoor", "SR", "PV"]}
+    forecast = forecast_inputs(
+        truth, 6, 12, "persistence", None, 1.0, 0.2, previous_days(dates, day)
+    )
+    assert np.array_equal(forecast["outdoor"][:, 0], [0, 0, 2, 3])
+
+
+def test_receding_horizon_with_a_perfect_forecast_is_optimal(building, data_files):
+    building.AC_size = 15.0
+    building.ready_df = building.ready_df[building.ready_df["month"] == 1].copy()
+    functions.apply_tariff(building.ready_df, "TR0001")
+    building = run_scenarios(building, optimal=True)
+    building = mpc_precool(building, horizon=24, forecast="perfect")
+
+    assert (building.final_df["Q_opt"] < 0).any()
+    assert np.allclose(
+        building.final_df["Q_mpc"], building.final_df["Q_opt"], rtol=0, atol=1e-9
+    )
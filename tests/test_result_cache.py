@@ -0,0 +1,31 @@
+import copy
+
+import pandas as pd
+
+from DevelopThermalDynamicsModel import run_scenarios
+from ResultCache import ResultCache
+
+
+def test_cache_hit_builds_the_figures(building, data_files):
+    from dynamicFigures import generate_single_building_graphs
+
+    cache = ResultCache("result_cache")
+    fresh = copy.deepcopy(building)
+    expected = run_scenarios(building, cache=cache)
+    hit = run_scenarios(fresh, cache=cache)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    pd.testing.assert_frame_equal(hit.final_df, expected.final_df)
+    pd.testing.assert_frame_equal(hit.monthly_saving, expected.monthly_saving)
+    assert hit.total_cost_Savings == expected.total_cost_Savings
+    assert generate_single_building_graphs(hit)
+
+
+def test_key_changes_with_the_result_version(building, monkeypatch):
+    import ResultCache as module
+
+    cache = ResultCache("result_cache")
+    key = cache.key(building, optimal=False)
+    assert cache.key(building, optimal=False) == key
+    monkeypatch.setattr(module, "RESULT_VERSION", module.RESULT_VERSION + 1)
+    assert cache.key(building, optimal=False) != key
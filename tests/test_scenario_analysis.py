@@ -0,0 +1,83 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions
+from DevelopThermalDynamicsModel import run_scenarios
+from ScenarioAnalysis import (
+    coefficient_uncertainty,
+    evaluate,
+    prepare_inputs,
+    size_for_target,
+    sweep,
+)
+
+
+@pytest.fixture
+def priced(building, data_files):
+    functions.apply_tariff(building.ready_df, "TR0001")
+    return building
+
+
+def season_totals(building):
+    """Results of run_scenarios as returned by evaluate"""
+    return {
+        "total_cost_Savings": building.total_cost_Savings,
+        "total_emission_reduction": building.total_emission_reduction,
+        "W_bs": building.final_df["W_bs"].sum(),
+        "W_spc": building.final_df["W_spc"].sum(),
+    }
+
+
+def test_sweep_matches_run_scenarios_with_rescaled_PV(priced):
+    table = sweep(priced, 5.0, AC_sizes=[4.0, 9.0], PV_capacities=[5.0, 7.5])
+    row = table[(table["AC_size"] == 9.0) & (table["PV_capacity"] == 7.5)]
+
+    expected = copy.deepcopy(priced)
+    expected.AC_size = 9.0
+    expected.ready_df["PV"] = expected.ready_df["PV"] * 7.5 / 5.0
+    expected.ready_df["Surplus_PV"] = (
+        expected.ready_df["PV"] - expected.ready_df["Demand"]
+    ).clip(lower=0)
+    expected = run_scenarios(expected)
+    for name, value in season_totals(expected).items():
+        assert np.isclose(row[name].item(), value, rtol=1e-12, atol=1e-9), name
+
+
+def test_zero_covariance_draws_equal_the_point_estimate(priced):
+    covariance = pd.DataFrame(
+        0.0,
+        index=priced.thermal_coefficients.index,
+        columns=priced.thermal_coefficients.index,
+    )
+    intervals, samples = coefficient_uncertainty(
+        priced, draws=6, covariance=covariance, chunk=4
+    )
+    assert len(samples) == 6
+
+    expected = season_totals(run_scenarios(copy.deepcopy(priced)))
+    for name, value in expected.items():
+        assert np.allclose(samples[name], value, rtol=1e-12, atol=1e-9), name
+        assert intervals.loc[name, "lower"] == intervals.loc[name, "upper"]
+
+
+def test_size_for_target_is_the_smallest_capacity_meeting_it(priced):
+    inputs = prepare_inputs(priced, 5.0)
+    target, tolerance = 3000.0, 0.05
+    found = size_for_target(priced, 5.0, target, tolerance=tolerance, inputs=inputs)
+    assert found["W_spc"] <= target
+
+    W_spc = evaluate(
+        inputs,
+        found["AC_size"] - tolerance,
+        found["PV_capacity"],
+        found["neutral_temp"],
+        found["upper_limit"],
+        found["lower_limit"],
+    )["W_spc"][0]
+    assert W_spc > target
+
+    with pytest.raises(ValueError, match="does not reach the target"):
+        size_for_target(priced, 5.0, 0.0, inputs=inputs)
@@ -0,0 +1,104 @@
+import collections
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import DevelopThermalDynamicsModel as model
+import functions
+from DevelopThermalDynamicsModel import reprice_scenarios, run_scenarios
+
+
+def add_tariff(tariff_id, FiT):
+    """Adds a copy of the first tariff with another FiT to RetailTariffs.json"""
+    with open("RetailTariffs.json") as file:
+        tariffs = json.load(file)
+    tariff = copy.deepcopy(tariffs[0]["Tariffs"][0])
+    tariff["Tariff ID"] = tariff_id
+    tariff["Parameters"]["FiT"]["Value"] = FiT
+    tariffs[0]["Tariffs"].append(tariff)
+    with open("RetailTariffs.json", "w") as file:
+        json.dump(tariffs, file)
+
+
+def test_reprice_solves_the_optimal_strategy_again(building, data_files):
+    # Exports pay more than imports cost, so pre-cooling with PV no longer pays
+    add_tariff("HIGH_FIT", 5.0)
+    building.AC_size = 15.0
+    building.ready_df = building.ready_df[building.ready_df["month"] == 1].copy()
+    functions.apply_tariff(building.ready_df, "TR0001")
+    building = run_scenarios(building, optimal=True)
+    Q_opt = building.final_df["Q_opt"].to_numpy()
+    building = reprice_scenarios(building, "HIGH_FIT")
+    assert not np.array_equal(building.final_df["Q_opt"].to_numpy(), Q_opt)
+
+    expected = copy.copy(building)
+    expected.ready_df = building.ready_df.drop(columns="Occupancy")
+    expected = run_scenarios(expected, optimal=True)
+    pd.testing.assert_frame_equal(building.final_df, expected.final_df)
+    assert building.total_cost_Savings_opt == expected.total_cost_Savings_opt
+
+
+def test_reprice_reads_the_tariffs_once_and_writes_nothing(
+    building, data_files, monkeypatch, tmp_path
+):
+    functions.apply_tariff(building.ready_df, "TR0001")
+    building = run_scenarios(building)
+    expected = building.final_df.copy()
+    read_tariffs = functions.read_tariffs
+    reads = []
+    monkeypatch.setattr(
+        functions, "read_tariffs", lambda: reads.append(1) or read_tariffs()
+    )
+    monkeypatch.setattr(model, "read_emission_intensity", None)
+    before = sorted(tmp_path.iterdir())
+
+    building = reprice_scenarios(building, "TR0001")
+    assert len(reads) == 1 and sorted(tmp_path.iterdir()) == before
+    pd.testing.assert_frame_equal(building.final_df, expected)
+
+
+def test_baseline_memo_is_opt_in_and_bounded(building, monkeypatch):
+    monkeypatch.setattr(model, "_baseline_cache", collections.OrderedDict())
+    model.simulate_buildings(
+        [building.thermal_coefficients] * 2,
+        [5.0, 7.0],
+        [building.ready_df] * 2,
+        neutral=25,
+        upper=27,
+        lower=21,
+    )
+    assert len(model._baseline_cache) == 0
+
+    building.simulate_summer()
+    (entry,) = model._baseline_cache.values()
+    size = sum(values.nbytes for values in entry.values())
+
+    # Room for two baselines, the least recently used one is evicted
+    monkeypatch.setattr(model, "BASELINE_CACHE_BYTES", 2 * size)
+    for AC_size in [5.0, 6.0, 7.0]:
+        building.AC_size = AC_size
+        building.simulate_summer()
+    assert len(model._baseline_cache) == 2
+    building.simulate_summer(workers=2)
+    assert len(model._baseline_cache) == 2
+
+
+def test_sweep_workers_agree_and_zero_workers_is_rejected(
+    building, data_files, monkeypatch
+):
+    from ScenarioAnalysis import sweep
+
+    grid = dict(AC_sizes=[5.0, 7.0], neutral_temps=[24, 25], lower_limits=[20, 21])
+    with monkeypatch.context() as patch:
+        # No process pool unless asked for
+        patch.setattr(model, "ProcessPoolExecutor", None)
+        serial = sweep(building, 5.0, **grid)
+    pd.testing.assert_frame_equal(sweep(building, 5.0, workers=2, **grid), serial)
+
+    with pytest.raises(ValueError, match="workers"):
+        sweep(building, 5.0, workers=0, **grid)
+    with pytest.raises(ValueError, match="workers"):
+        building.simulate_summer(workers=0)
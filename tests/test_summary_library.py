@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import SummaryLibrary
+
+
+def write_savings_workbook(path, seed=0):
+    """Writes a savings overview with a text column missing a cell"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "Archetype": ["Apartment", None, "House", "Townhouse"],
+            "Buildings": rng.integers(1, 100, 4),
+            "Maximum savings": rng.uniform(0, 200, 4),
+            "Percentage of buildings 2022": [10.0, 20.0, 30.0, 40.0],
+        }
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_excel(path, index=False)
+
+
+def test_savings_copy_matches_the_workbook_until_it_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(SummaryLibrary, "_overview", {})
+    workbook, copy = SummaryLibrary.SAVINGS_WORKBOOK, SummaryLibrary.SAVINGS_COPY
+    write_savings_workbook(workbook)
+
+    # Reading never writes the copy
+    expected = SummaryLibrary.read_savings_overview()
+    assert not os.path.exists(copy)
+
+    SummaryLibrary.build_savings_copy()
+    pd.testing.assert_frame_equal(SummaryLibrary.read_savings_copy(), expected)
+
+    write_savings_workbook(workbook, seed=1)
+    assert SummaryLibrary.read_savings_copy() is None
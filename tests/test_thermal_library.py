@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+from conftest import COEFFICIENTS, write_processed_file
+
+import ThermalLibrary
+from DevelopThermalDynamicsModel import (
+    Building,
+    least_squares_fit,
+    thermal_regression_data,
+)
+
+
+def test_coefficient_table_matches_the_fit_until_the_file_changes(
+    processed_files, monkeypatch
+):
+    monkeypatch.setattr(ThermalLibrary, "_tables", {})
+    ThermalLibrary.build_coefficient_table()
+    name = processed_files[0]
+    path = "Data/Processed_thermal_dynamics/{}.csv".format(name)
+
+    params, covariance = ThermalLibrary.lookup_coefficients(name)
+    fitted, fitted_covariance, _ = least_squares_fit(
+        *thermal_regression_data(ThermalLibrary.read_processed_file(path))
+    )
+    assert np.allclose(params[fitted.index], fitted, rtol=1e-10, atol=1e-12)
+
+    # Touched but not changed
+    os.utime(path, ns=(0, 0))
+    assert ThermalLibrary.lookup_coefficients(name)[0] is not None
+    assert ThermalLibrary.stale_archetypes() == []
+
+    write_processed_file(path, seed=5)
+    assert ThermalLibrary.lookup_coefficients(name) == (None, None)
+    assert ThermalLibrary.stale_archetypes() == [name]
+
+
+def test_thermal_store_matches_the_file_until_it_changes(processed_files, monkeypatch):
+    monkeypatch.setattr(ThermalLibrary, "_stores", {})
+    ThermalLibrary.build_thermal_store()
+    building = Building(
+        starRating="2star",
+        weight="Heavy",
+        type="Apartment",
+        size="Large",
+        AC_size=7.0,
+        city="Adelaide",
+        thermal_coefficients=COEFFICIENTS.copy(),
+        thermal_dynamics_df=pd.DataFrame(),
+    )
+    path = "Data/Processed_thermal_dynamics/{}.csv".format(processed_files[0])
+
+    building.read_thermal_dynamics_file()
+    pd.testing.assert_frame_equal(
+        building.thermal_dynamics_df, ThermalLibrary.read_processed_file(path)
+    )
+    assert ThermalLibrary.load_thermal_dynamics(processed_files[0], ["SR"])["SR"].shape
+    assert ThermalLibrary.load_thermal_dynamics(processed_files[0], ["PV"]) is None
+
+    write_processed_file(path, seed=5)
+    assert ThermalLibrary.load_thermal_dynamics(processed_files[0]) is None
+    building.read_thermal_dynamics_file()
+    pd.testing.assert_frame_equal(
+        building.thermal_dynamics_df, ThermalLibrary.read_processed_file(path)
+    )
+
+
+def test_rebuilds_leave_open_stores_intact_and_are_picked_up(
+    processed_files, monkeypatch
+):
+    monkeypatch.setattr(ThermalLibrary, "_stores", {})
+    monkeypatch.setattr(ThermalLibrary, "_tables", {})
+    name = processed_files[0]
+    path = "Data/Processed_thermal_dynamics/{}.csv".format(name)
+    assert ThermalLibrary.load_coefficient_table() is None
+    ThermalLibrary.build_coefficient_table()
+    assert ThermalLibrary.load_coefficient_table() is not None
+
+    ThermalLibrary.build_thermal_store()
+    before = ThermalLibrary.load_thermal_dynamics(name)["SR"]
+    expected = np.array(before)
+
+    write_processed_file(path, seed=5)
+    ThermalLibrary.build_thermal_store()
+    # The previous build is no longer on disk but stays mapped
+    assert len(os.listdir(ThermalLibrary.THERMAL_STORE)) == 8
+    assert np.array_equal(before, expected)
+    assert np.array_equal(
+        ThermalLibrary.load_thermal_dynamics(name)["SR"],
+        ThermalLibrary.read_processed_file(path)["SR"],
+    )
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+import WeatherLibrary
+
+
+def write_climate_file(path, offset=0):
+    """Writes two days of a fixed-width climate file"""
+    lines = []
+    for hour in range(48):
+        fields = [0] * len(WeatherLibrary.TMY_WIDTHS)
+        fields[1:5] = [90, 1, 1 + hour // 24, hour % 24]
+        fields[5] = 200 + hour + offset
+        fields[8] = 35
+        fields[17:22] = [hour * 10, hour, hour * 2, 45, 180]
+        lines.append(
+            "".join(
+                str(value).rjust(width, "0")
+                for value, width in zip(fields, WeatherLibrary.TMY_WIDTHS)
+            )
+        )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def test_weather_cache_matches_the_climate_file_until_it_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(WeatherLibrary, "_weather", {})
+    path = WeatherLibrary.climate_file("Adelaide")
+    write_climate_file(path)
+    parsed = WeatherLibrary.parse_climate_file(path)
+    assert parsed["DBT"][1] == 20.1 and parsed["year"][0] == 1990
+
+    # Reading never writes the cache
+    WeatherLibrary.read_climate("Adelaide")
+    assert not os.path.exists(WeatherLibrary.WEATHER_CACHE)
+
+    WeatherLibrary.build_weather_cache(["Adelaide"])
+    cached = WeatherLibrary.read_cached_climate("Adelaide")
+    for name, values in parsed.items():
+        assert np.array_equal(cached[name], values)
+
+    write_climate_file(path, offset=5)
+    assert WeatherLibrary.read_cached_climate("Adelaide") is None
+    assert WeatherLibrary.read_climate("Adelaide")["DBT"][1] == 20.6